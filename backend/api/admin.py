@@ -6,6 +6,7 @@ from .models import (
     PhaseTwoFunFact, PhaseTwoDayInLife, PhaseTwoScenario, PhaseTwoReflection
 )
 from django import forms
+from . import scaffolding
 
 # Register your models here.
 
@@ -104,20 +105,7 @@ class LearningPageAdmin(admin.ModelAdmin):
         super().save_model(request, obj, form, change)
         # Only create default sections if this is a new learning page
         if not change and not obj.sections.exists():
-            sections = [
-                ('overview', 'Overview'),
-                ('scope', 'Scope and Impact'),
-                ('opportunities', 'Opportunities'),
-                ('skills', 'Skills Required'),
-                ('knowledge', 'Knowledge Areas')
-            ]
-            for order, (section_type, _) in enumerate(sections):
-                PageSection.objects.create(
-                    learning_page=obj,
-                    section_type=section_type,
-                    content='Coming soon...',
-                    order=order
-                )
+            scaffolding.scaffold_page(obj)
 
 # Register models in the correct order
 admin.site.register(CustomUser, CustomUserAdmin)
@@ -7,3 +7,10 @@ class ApiConfig(AppConfig):
 
     def ready(self):
         import api.signals  # Import signals when the app is ready
+        from . import passwords, warmup
+        # Load the password validators (and the common password list) now
+        # rather than on the first registration
+        passwords.warm()
+        # Opt-in priming that needs no database (API_WARMUP); the application
+        # runs the database stages once it is loaded
+        warmup.on_ready()
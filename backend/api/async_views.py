@@ -0,0 +1,111 @@
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from rest_framework import exceptions
+from . import authentication, fast_serializers, generations, page_cache, xp_buffer
+from .models import CareerTrack, Interest, LearningPage
+from .pagination import KeysetPagination, StreamingListMixin
+from .renderers import FastJSONRenderer
+from .views import CareerTrackViewSet, InterestViewSet, UserViewSet
+
+# Async versions of the hot read endpoints, for the ASGI application
+# (career_craft/asgi_urls.py routes them ahead of the viewsets). Each answers
+# the same URL with the same JSON as its viewset action, without holding a
+# thread for the whole request: cached learning pages and users/me with a
+# cached token never leave the event loop with the per-process cache (a
+# shared one is read from a thread, see generations.acall()), and the rest
+# await the async ORM, which in Django 5.2 still runs each query on a worker
+# thread. Whatever they
+# don't cover (other methods, paged or streamed lists, the browsable API)
+# goes to the viewset as before.
+
+# Query parameters that ask for something other than a plain JSON list
+NOT_PLAIN = {
+    StreamingListMixin.stream_query_param,
+    KeysetPagination.cursor_query_param,
+    KeysetPagination.page_size_query_param,
+    'format',
+}
+
+_career_track_list = sync_to_async(CareerTrackViewSet.as_view({'get': 'list'}))
+_career_track_detail = sync_to_async(CareerTrackViewSet.as_view({'get': 'retrieve'}))
+_learning_page = sync_to_async(CareerTrackViewSet.as_view({'get': 'learning_page'}))
+_interest_list = sync_to_async(InterestViewSet.as_view({'get': 'list'}))
+_user_me = sync_to_async(UserViewSet.as_view({'get': 'me'}))
+
+
+def plain(request):
+    # A GET for JSON the async view can answer itself
+    return (
+        request.method == 'GET'
+        and 'text/html' not in request.headers.get('Accept', '')
+        and not NOT_PLAIN.intersection(request.GET)
+    )
+
+
+def respond(data, status=200):
+    return HttpResponse(FastJSONRenderer().render(data), content_type='application/json', status=status)
+
+
+def not_found(detail='Not found.'):
+    # DRF's answer to Http404
+    return respond({'detail': detail}, status=404)
+
+
+async def career_track_list(request):
+    if not plain(request):
+        return await _career_track_list(request)
+    return respond(await fast_serializers.acareer_tracks(CareerTrack.objects.all()))
+
+
+async def career_track_detail(request, slug):
+    if not plain(request):
+        return await _career_track_detail(request, slug=slug)
+    tracks = await fast_serializers.acareer_tracks(CareerTrack.objects.filter(slug=slug))
+    if not tracks:
+        return not_found()
+    return respond(tracks[0])
+
+
+async def learning_page(request, slug):
+    if not plain(request):
+        return await _learning_page(request, slug=slug)
+    try:
+        page_number = int(request.GET.get('page', 1))
+    except ValueError:
+        return respond({'error': 'Invalid page number'}, status=400)
+
+    cached = await generations.acall(page_cache.get, slug, page_number)
+    if cached is not None:
+        return page_cache.respond(request, cached)
+
+    track_id = await CareerTrack.objects.filter(slug=slug).values_list('pk', flat=True).afirst()
+    if track_id is None:
+        return not_found('No CareerTrack matches the given query.')
+    pages = await fast_serializers.alearning_pages(
+        LearningPage.objects.filter(career_track_id=track_id, page_number=page_number)
+    )
+    if not pages:
+        return respond({'error': f'Page {page_number} not found'}, status=404)
+    return page_cache.respond(request, await generations.acall(page_cache.store, slug, page_number, pages[0]))
+
+
+async def interest_list(request):
+    if not plain(request):
+        return await _interest_list(request)
+    return respond(await fast_serializers.ainterests(Interest.objects.all()))
+
+
+async def user_me(request):
+    if not plain(request):
+        return await _user_me(request)
+    # 403 rather than 401, as SessionAuthentication comes first
+    try:
+        user, _ = await authentication.aauthenticate(request)
+    except exceptions.AuthenticationFailed as e:
+        return respond({'detail': e.detail}, status=403)
+    if user is None:
+        return respond({'detail': exceptions.NotAuthenticated.default_detail}, status=403)
+    data = fast_serializers.user(user)
+    if xp_buffer.enabled():
+        data['xp'] = await sync_to_async(xp_buffer.user_xp)(user.pk)
+    return respond(data)
@@ -0,0 +1,295 @@
+import hashlib
+import hmac
+import json
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import models, transaction
+from django.utils import timezone
+from rest_framework import exceptions
+from rest_framework.authentication import BasicAuthentication, TokenAuthentication, get_authorization_header
+from rest_framework.authtoken.models import Token
+from . import generations
+
+# Token and Basic authentication with per-worker caches of credentials -> user.
+# A worker keeps the user it loaded for a token, or for a good username and
+# password (under a per-process HMAC, never the password), as column values
+# until the TTL passes or the user's generation moves; both caches stay off
+# unless the cache is shared (api/generations.py). Tokens expire
+# AUTH_TOKEN_LIFETIME after they are issued.
+
+GENERATION_KEY = 'auth_token:generation'
+
+# Per-process key for credential digests
+_CREDENTIAL_KEY = secrets.token_bytes(32)
+
+
+class Entry:
+    __slots__ = ('user_id', 'row', 'created', 'generations', 'expires')
+
+    def __init__(self, user_id, row=None, created=None, generations=None, expires=0.0):
+        self.user_id = user_id
+        self.row = row
+        self.created = created
+        self.generations = generations
+        self.expires = expires
+
+
+def _row(user):
+    # The user's column values, JSON fields serialized so that no two
+    # requests share a mutable list or dict (and json.loads is several
+    # times faster than copy.deepcopy)
+    fields = user._meta.concrete_fields
+    return (
+        user._state.db,
+        [field.attname for field in fields],
+        [
+            json.dumps(getattr(user, field.attname)) if isinstance(field, models.JSONField) else getattr(user, field.attname)
+            for field in fields
+        ],
+        [position for position, field in enumerate(fields) if isinstance(field, models.JSONField)],
+    )
+
+
+def _column(row, name):
+    _, names, values, _ = row
+    return values[names.index(name)]
+
+
+def _user(model, row):
+    db, names, values, json_positions = row
+    values = list(values)
+    for position in json_positions:
+        values[position] = json.loads(values[position])
+    return model.from_db(db, names, values)
+
+
+def token_lifetime():
+    return getattr(settings, 'AUTH_TOKEN_LIFETIME', timedelta(days=30))
+
+
+def expiry_cutoff():
+    # Tokens created before this have expired; None when tokens never expire
+    lifetime = token_lifetime()
+    return None if lifetime is None else timezone.now() - lifetime
+
+
+def is_expired(created):
+    cutoff = expiry_cutoff()
+    return cutoff is not None and created <= cutoff
+
+
+def issue_token(user):
+    # The user's token, replaced with a new one if it has expired
+    token, created = Token.objects.get_or_create(user=user)
+    if not created and is_expired(token.created):
+        with transaction.atomic():
+            Token.objects.filter(pk=token.pk).delete()
+            token, _ = Token.objects.get_or_create(user=user)
+    return token
+
+
+def _user_key(user_id):
+    return f'auth_token:user:{user_id}'
+
+
+def _generations(user_id, store=None):
+    # (global generation, user generation)
+    return generations.current(
+        generations.Generation(GENERATION_KEY, store), generations.Generation(_user_key(user_id), store)
+    )
+
+
+def invalidate_user(user_id, store=None):
+    # Retire the user's cached tokens and credentials on every worker
+    # sharing the cache
+    generations.Generation(_user_key(user_id), store).bump()
+
+
+def invalidate_all(store=None):
+    generations.Generation(GENERATION_KEY, store).bump()
+
+
+class UserCache:
+    # A worker's LRU of key -> Entry, each entry good for `ttl_setting`
+    # seconds unless the user's generation moves first. Holds nothing while
+    # the cache isn't shared.
+
+    def __init__(self, ttl_setting, default_ttl, size_setting, default_size, store=None):
+        self.ttl_setting, self.default_ttl = ttl_setting, default_ttl
+        self.size_setting, self.default_size = size_setting, default_size
+        # Where the generations are kept, when not the default cache
+        self.store = store
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def enabled(self):
+        return generations.shared()
+
+    def known(self, key):
+        # The entry whatever its state, for its user_id
+        return self.entries.get(key) if self.enabled() else None
+
+    def generations(self, user_id):
+        return _generations(user_id, self.store)
+
+    def get(self, key):
+        # The entry if it is still current, else None
+        entry = self.known(key)
+        if entry is None or entry.row is None or entry.expires < time.monotonic():
+            return None
+        if entry.generations != self.generations(entry.user_id):
+            return None
+        return entry
+
+    def remember(self, key, user, generations, created=None):
+        # Caches the user under key. Without generations read before the
+        # user was loaded only the owner is noted, for next time.
+        if not self.enabled():
+            return
+        known = self.entries.get(key)
+        if generations is not None and known is not None and known.user_id == user.pk and user.is_active:
+            ttl = getattr(settings, self.ttl_setting, self.default_ttl)
+            entry = Entry(user.pk, _row(user), created, generations, time.monotonic() + ttl)
+        else:
+            entry = Entry(user.pk)
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > getattr(settings, self.size_setting, self.default_size):
+                self.entries.popitem(last=False)
+
+    def forget(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+tokens = UserCache('AUTH_TOKEN_CACHE_TTL', 60, 'AUTH_TOKEN_CACHE_SIZE', 10000)
+credentials = UserCache('AUTH_BASIC_CACHE_TTL', 30, 'AUTH_BASIC_CACHE_SIZE', 1000)
+
+
+def forget(key):
+    tokens.forget(key)
+
+
+def clear():
+    tokens.clear()
+    credentials.clear()
+
+
+def credential_digest(userid, password):
+    message = f'{userid}\0{password}'.encode()
+    return hmac.new(_CREDENTIAL_KEY, message, hashlib.sha256).digest()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        model = self.get_model()
+        entry = tokens.get(key)
+        if entry is not None:
+            return self._cached(model, key, entry)
+        known = tokens.known(key)
+        generations = tokens.generations(known.user_id) if known is not None else None
+        try:
+            token = model.objects.select_related('user').get(key=key)
+        except model.DoesNotExist:
+            tokens.forget(key)
+            raise exceptions.AuthenticationFailed('Invalid token.')
+        return self._loaded(key, token, generations)
+
+    async def aauthenticate(self, request):
+        # authenticate() for async views
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) == 1:
+            raise exceptions.AuthenticationFailed('Invalid token header. No credentials provided.')
+        if len(auth) > 2:
+            raise exceptions.AuthenticationFailed('Invalid token header. Token string should not contain spaces.')
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed(
+                'Invalid token header. Token string should not contain invalid characters.'
+            )
+        return await self.aauthenticate_credentials(key)
+
+    async def aauthenticate_credentials(self, key):
+        model = self.get_model()
+        entry = await generations.acall(tokens.get, key)
+        if entry is not None:
+            return self._cached(model, key, entry)
+        known = tokens.known(key)
+        stamps = await generations.acall(tokens.generations, known.user_id) if known is not None else None
+        try:
+            token = await model.objects.select_related('user').aget(key=key)
+        except model.DoesNotExist:
+            tokens.forget(key)
+            raise exceptions.AuthenticationFailed('Invalid token.')
+        return self._loaded(key, token, stamps)
+
+    def _cached(self, model, key, entry):
+        user = _user(model.user.field.related_model, entry.row)
+        token = model(key=key, user=user, created=entry.created)
+        token._state.adding = False
+        return self._check(user, token)
+
+    def _loaded(self, key, token, generations):
+        tokens.remember(key, token.user, generations, token.created)
+        return self._check(token.user, token)
+
+    def _check(self, user, token):
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        if is_expired(token.created):
+            raise exceptions.AuthenticationFailed('Token has expired.')
+        return (user, token)
+
+
+class CachedBasicAuthentication(BasicAuthentication):
+    def authenticate_credentials(self, userid, password, request=None):
+        digest = credential_digest(userid, password)
+        entry = credentials.get(digest)
+        model = get_user_model()
+        if entry is not None:
+            return (_user(model, entry.row), None)
+
+        known = credentials.known(digest)
+        generations = credentials.generations(known.user_id) if known is not None else None
+        if known is not None and known.row is not None:
+            # Retired by a save (every XP award is one): renew from the row
+            # while the password hash and username are unchanged
+            user = model._default_manager.filter(pk=known.user_id).first()
+            if (
+                user is not None and user.is_active
+                and user.password == _column(known.row, 'password')
+                and user.get_username() == userid
+            ):
+                credentials.remember(digest, user, generations)
+                return (user, None)
+        user, auth = super().authenticate_credentials(userid, password, request)
+        credentials.remember(digest, user, generations)
+        return (user, auth)
+
+
+async def aauthenticate(request):
+    # DEFAULT_AUTHENTICATION_CLASSES for async views, in the same order:
+    # (user, auth), or (None, None) for an anonymous request. Raises
+    # AuthenticationFailed like the classes do.
+    user = await request.auser()
+    if user.is_active:
+        return (user, None)
+    scheme = get_authorization_header(request).split()[:1]
+    if scheme and scheme[0].lower() == b'basic':
+        # Cache misses hash the password, which is no work for the event loop
+        return await sync_to_async(CachedBasicAuthentication().authenticate)(request) or (None, None)
+    return await CachedTokenAuthentication().aauthenticate(request) or (None, None)
@@ -0,0 +1,509 @@
+import asyncio
+import gzip
+import io
+import multiprocessing
+import random
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.contrib.auth import get_user_model, password_validation
+from django.contrib.auth.hashers import make_password
+from django.db import OperationalError, connection, connections, transaction
+from django.db.models import Prefetch
+from django.test.utils import override_settings
+from rest_framework.authentication import BasicAuthentication, TokenAuthentication
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from . import authentication, fast_serializers, generations, instrumentation, leaderboard, loadtest, passwords, sampling, scoring
+from .loader import BulkLoader
+from .models import CareerTrack, Interest, OnboardingQuestion
+from .authentication import CachedBasicAuthentication, CachedTokenAuthentication
+from .renderers import FastJSONParser, FastJSONRenderer, orjson
+from .serializers import CareerTrackSerializer, LearningPageSerializer
+
+# Scenarios for the benchmark management command. Each takes a scale (how
+# much synthetic data to generate, None for its default) and a repeat count,
+# and returns a JSON-serializable dict of results.
+
+SCENARIOS = {}
+
+
+def scenario(name):
+    def register(func):
+        SCENARIOS[name] = func
+        return func
+    return register
+
+
+def summarize(timings):
+    # Latency summary for a list of per-operation timings in seconds
+    timings = sorted(timings)
+    count = len(timings)
+
+    def percentile(fraction):
+        return round(timings[min(count - 1, int(fraction * count))] * 1e6, 2)
+
+    total = sum(timings)
+    return {
+        'count': count,
+        'mean_us': round(total / count * 1e6, 2),
+        'p50_us': percentile(0.50),
+        'p95_us': percentile(0.95),
+        'p99_us': percentile(0.99),
+        'ops_per_sec': round(count / total) if total else None,
+    }
+
+
+@contextmanager
+def rolled_back():
+    # Seed synthetic rows for a scenario without keeping them
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def measure(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return summarize(timings)
+
+
+@scenario('leaderboard')
+def leaderboard_index(scale, repeat):
+    # Sorted leaderboard index over synthetic users; no database involved
+    users = scale or 1_000_000
+    start = time.perf_counter()
+    index = leaderboard.SortedIndex((user_id, random.randrange(100_000)) for user_id in range(users))
+    build_seconds = time.perf_counter() - start
+
+    def user():
+        return random.randrange(users)
+
+    return {
+        'users': users,
+        'build_seconds': round(build_seconds, 3),
+        'update': measure(lambda: index.update(user(), random.randrange(100_000)), repeat),
+        'rank': measure(lambda: index.rank(user()), repeat),
+        'top_10': measure(lambda: index.top(10), repeat),
+        'around_me': measure(lambda: index.around(user(), 5), repeat),
+    }
+
+
+@scenario('onboarding_sampler')
+def onboarding_sampler(scale, repeat):
+    # ORDER BY RANDOM() against the cached id sampler over synthetic questions
+    questions = scale or 10_000
+    types = ['yes_no', 'multi_choice', 'scale_1_5']
+    with rolled_back():
+        OnboardingQuestion.objects.bulk_create(
+            OnboardingQuestion(text=f'Question {i}', type=types[i % 3], tags=[f'tag{i % 40}'])
+            for i in range(questions)
+        )
+        sampling.invalidate()
+        start = time.perf_counter()
+        sampling.get_pool()
+        pool_seconds = time.perf_counter() - start
+
+        results = {
+            'questions': questions,
+            'pool_build_seconds': round(pool_seconds, 4),
+            'order_by_random': measure(
+                lambda: list(OnboardingQuestion.objects.order_by('?')[:5]), max(1, repeat // 10)
+            ),
+            'sampler': measure(
+                lambda: list(OnboardingQuestion.objects.filter(
+                    pk__in=sampling.sample_questions(5, seed=random.random())
+                )), repeat
+            ),
+            'sampler_by_type': measure(
+                lambda: sampling.sample_questions(5, seed=random.random(), stratify='type'), repeat
+            ),
+        }
+    sampling.invalidate()
+    return results
+
+
+def seed_tracks(count):
+    # Synthetic tracks with 5 pages of default content each
+    loader = BulkLoader()
+    loader.run(
+        ({'title': f'Bench track {i}', 'emoji': '🚀', 'interests': [f'Bench {i % 30}', f'Bench {i % 7}', 'Bench all'], 'pages': 5}
+         for i in range(count)),
+        loader.load_tracks
+    )
+
+
+@scenario('serializers')
+def serializers(scale, repeat):
+    # DRF serializers against fast_serializers for the payloads of the hot
+    # read endpoints, rendered to JSON, over synthetic tracks with 5 pages each
+    tracks = scale or 1000
+    render = JSONRenderer().render
+    with rolled_back():
+        seed_tracks(tracks)
+        track = CareerTrack.objects.filter(title__startswith='Bench track').order_by('pk').first()
+        track_ids = list(CareerTrack.objects.order_by('?').values_list('pk', flat=True)[:20])
+        ordered_interests = Prefetch('relevant_interests', queryset=Interest.objects.order_by('id'))
+
+        def drf_tracks(queryset):
+            return render(CareerTrackSerializer(queryset.prefetch_related(ordered_interests), many=True).data)
+
+        def drf_recommendations():
+            tracks = CareerTrack.objects.prefetch_related(ordered_interests).in_bulk(track_ids)
+            return render(CareerTrackSerializer([tracks[pk] for pk in track_ids], many=True).data)
+
+        endpoints = {
+            'career_tracks_list': (
+                lambda: drf_tracks(CareerTrack.objects.all()),
+                lambda: render(fast_serializers.career_tracks(CareerTrack.objects.all())),
+            ),
+            'learning_pages': (
+                lambda: render(LearningPageSerializer(track.learning_pages.with_content(), many=True).data),
+                lambda: render(fast_serializers.learning_pages(track.learning_pages.all())),
+            ),
+            'recommendations': (
+                drf_recommendations,
+                lambda: render(fast_serializers.career_tracks_by_id(track_ids)),
+            ),
+        }
+        results = {'tracks': tracks}
+        for name, (drf, fast) in endpoints.items():
+            # The list endpoint is much heavier than the others
+            count = max(1, repeat // 100) if name == 'career_tracks_list' else repeat
+            timings = {'drf': measure(drf, count), 'fast': measure(fast, count)}
+            timings['speedup'] = round(timings['drf']['mean_us'] / timings['fast']['mean_us'], 2)
+            results[name] = timings
+    return results
+
+
+@scenario('renderers')
+def renderers(scale, repeat):
+    # DRF's JSONRenderer/JSONParser against the orjson-backed pair on the
+    # payloads of the main endpoints, plus what gzip would save on each
+    tracks = scale or 1000
+    with rolled_back():
+        seed_tracks(tracks)
+        track = CareerTrack.objects.filter(title__startswith='Bench track').order_by('pk').first()
+        payloads = {
+            'career_tracks_list': fast_serializers.career_tracks(CareerTrack.objects.all()),
+            'learning_pages': fast_serializers.learning_pages(track.learning_pages.all()),
+            'recommendations': fast_serializers.career_tracks_by_id(
+                list(CareerTrack.objects.order_by('pk').values_list('pk', flat=True)[:20])
+            ),
+            'leaderboard': {'results': [{'rank': i + 1, 'user': i, 'username': f'user{i}', 'xp': 10 * i} for i in range(100)]},
+        }
+    stdlib, fast = JSONRenderer(), FastJSONRenderer()
+    results = {'tracks': tracks, 'orjson': orjson is not None}
+    for name, data in payloads.items():
+        body = stdlib.render(data)
+        count = max(1, repeat // 100) if name == 'career_tracks_list' else repeat
+        timings = {
+            'bytes': len(body),
+            'gzip_bytes': len(gzip.compress(body, compresslevel=6)),
+            'stdlib_render': measure(lambda: stdlib.render(data), count),
+            'fast_render': measure(lambda: fast.render(data), count),
+            'stdlib_parse': measure(lambda: JSONParser().parse(io.BytesIO(body)), count),
+            'fast_parse': measure(lambda: FastJSONParser().parse(io.BytesIO(body)), count),
+        }
+        timings['render_speedup'] = round(timings['stdlib_render']['mean_us'] / timings['fast_render']['mean_us'], 2)
+        timings['parse_speedup'] = round(timings['stdlib_parse']['mean_us'] / timings['fast_parse']['mean_us'], 2)
+        results[name] = timings
+    return results
+
+
+def _scoring_writer(user_id, career_id, repeat):
+    # One writer process: quiz scoring transactions back to back, counting
+    # the ones the database refused
+    CustomUser = get_user_model()
+    user = CustomUser.objects.get(pk=user_id)
+    timings, failed = [], 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        try:
+            scoring.apply_results(user, career_id, [True])
+        except OperationalError:
+            failed += 1
+        timings.append(time.perf_counter() - start)
+    connections.close_all()
+    return timings, failed
+
+
+@scenario('database_writes')
+def database_writes(scale, repeat):
+    # Quiz scoring transactions from `scale` processes at once against the
+    # configured database profile (career_craft/database.py). Separate
+    # processes, so the database is what's measured rather than the GIL.
+    # The rows are committed for the other processes to see, and deleted
+    # afterwards.
+    CustomUser = get_user_model()
+    writers = scale or 8
+    track = CareerTrack.objects.create(title=f'Bench writes {random.random()}')
+    users = [
+        CustomUser.objects.create(username=f'bench-writer-{track.pk}-{i}', email=f'writer{i}@example.com')
+        for i in range(writers)
+    ]
+    connections.close_all()
+    try:
+        start = time.perf_counter()
+        with ProcessPoolExecutor(writers, mp_context=multiprocessing.get_context('fork')) as pool:
+            results = list(pool.map(_scoring_writer, [user.pk for user in users], [track.pk] * writers, [repeat] * writers))
+        elapsed = time.perf_counter() - start
+    finally:
+        CustomUser.objects.filter(pk__in=[user.pk for user in users]).delete()
+        track.delete()
+
+    timings = [timing for worker_timings, _ in results for timing in worker_timings]
+    failed = sum(failed for _, failed in results)
+    return {
+        'database': connection.vendor,
+        'profile': getattr(settings, 'DATABASE_PROFILE', None),
+        'options': {key: str(value) for key, value in connection.settings_dict['OPTIONS'].items()},
+        'writers': writers,
+        'transactions': len(timings),
+        'failed': failed,
+        'elapsed_seconds': round(elapsed, 3),
+        'transactions_per_sec': round((len(timings) - failed) / elapsed, 1),
+        'latency': summarize(timings),
+    }
+
+
+def measure_queries(func, repeat):
+    # measure() plus the queries and database time per call
+    with instrumentation.recording() as metrics:
+        results = measure(func, repeat)
+    results['queries_per_call'] = round(metrics.queries / repeat, 2)
+    results['db_us_per_call'] = round(metrics.db_seconds / repeat * 1e6, 2)
+    return results
+
+
+@scenario('token_auth')
+def token_auth(scale, repeat):
+    # DRF's TokenAuthentication against CachedTokenAuthentication for one
+    # token, warm and right after the user's entries were invalidated. The
+    # cache is off unless the configured cache backend is shared
+    # (CACHE_BACKEND=redis or memcached), when each check reads it once.
+    CustomUser = get_user_model()
+    with rolled_back():
+        user = CustomUser.objects.create(username='bench-token', email='bench-token@example.com')
+        key = authentication.issue_token(user).key
+        drf, cached = TokenAuthentication(), CachedTokenAuthentication()
+        authentication.clear()
+        cached.authenticate_credentials(key)
+        cached.authenticate_credentials(key)
+
+        def invalidated():
+            authentication.invalidate_user(user.pk)
+            cached.authenticate_credentials(key)
+
+        results = {
+            'cache_shared': generations.shared(),
+            'drf': measure_queries(lambda: drf.authenticate_credentials(key), repeat),
+            'cached': measure_queries(lambda: cached.authenticate_credentials(key), repeat),
+            'cached_after_invalidation': measure_queries(invalidated, repeat),
+        }
+    authentication.clear()
+    results['db_us_saved_per_request'] = round(results['drf']['db_us_per_call'] - results['cached']['db_us_per_call'], 2)
+    results['speedup'] = round(results['drf']['mean_us'] / results['cached']['mean_us'], 2)
+    return results
+
+
+def measure_cpu(func, repeat):
+    # measure_queries() plus the process CPU time per call
+    start = time.process_time()
+    results = measure_queries(func, repeat)
+    results['cpu_us_per_call'] = round((time.process_time() - start) / repeat * 1e6, 2)
+    return results
+
+
+@scenario('basic_auth')
+def basic_auth(scale, repeat):
+    # DRF's BasicAuthentication, which hashes the password every time,
+    # against CachedBasicAuthentication for one username and password. DRF
+    # gets a hundredth of the repeats since each call runs the full KDF. As
+    # with tokens, the cache is off unless the cache backend is shared.
+    CustomUser = get_user_model()
+    password = 'bench-basic-password'
+    with rolled_back():
+        user = CustomUser.objects.create_user(username='bench-basic', email='bench-basic@example.com', password=password)
+        drf, cached = BasicAuthentication(), CachedBasicAuthentication()
+        authentication.clear()
+        cached.authenticate_credentials(user.username, password)
+        cached.authenticate_credentials(user.username, password)
+
+        results = {
+            'cache_shared': generations.shared(),
+            'hasher': settings.PASSWORD_HASHERS[0].rsplit('.', 1)[-1],
+            'drf': measure_cpu(lambda: drf.authenticate_credentials(user.username, password), max(1, repeat // 100)),
+            'cached': measure_cpu(lambda: cached.authenticate_credentials(user.username, password), repeat),
+        }
+    authentication.clear()
+    results['cpu_us_saved_per_request'] = round(results['drf']['cpu_us_per_call'] - results['cached']['cpu_us_per_call'], 2)
+    results['speedup'] = round(results['drf']['mean_us'] / results['cached']['mean_us'], 2)
+    return results
+
+
+def _burst(register, size):
+    # Runs size registrations at once, one thread each as a threaded server
+    # would, while a bystander thread times a small request's worth of work
+    # every 10ms
+    latencies, bystander = [], []
+    done = threading.Event()
+
+    def timed(i):
+        start = time.perf_counter()
+        register(i)
+        latencies.append(time.perf_counter() - start)
+
+    def other_requests():
+        payload = {'id': 1, 'title': 'Track', 'tags': list(range(50))}
+        # Timed from when the request would have arrived, so waiting for
+        # the thread to be scheduled counts
+        while True:
+            arrival = time.perf_counter() + 0.01
+            if done.wait(0.01):
+                break
+            for _ in range(100):
+                JSONRenderer().render(payload)
+            bystander.append(time.perf_counter() - arrival)
+
+    watcher = threading.Thread(target=other_requests)
+    watcher.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=size) as executor:
+        list(executor.map(timed, range(size)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    watcher.join()
+    return {
+        'registrations_per_sec': round(size / elapsed, 2),
+        'latency': summarize(latencies),
+        'bystander': summarize(bystander),
+    }
+
+
+@scenario('registration')
+def registration(scale, repeat):
+    # A burst of sign-ups (a class joining at once): validating and hashing
+    # on each request thread, as create_user() did, unbounded and then
+    # limited to PASSWORD_HASHING_WORKERS at a time by api/passwords.py. The
+    # database insert is the same either way and is left out.
+    size = scale or 32
+    CustomUser = get_user_model()
+    password = 'bench-registration-password'
+
+    def inline(i):
+        user = CustomUser(username=f'bench-signup-{i}', email=f'bench-signup-{i}@example.com')
+        password_validation.validate_password(password, user)
+        make_password(password)
+
+    def bounded(i):
+        passwords.hash_password(password, CustomUser(username=f'bench-signup-{i}', email=f'bench-signup-{i}@example.com'))
+
+    passwords.warm()
+    return {
+        'burst': size,
+        'hasher': settings.PASSWORD_HASHERS[0].rsplit('.', 1)[-1],
+        'hashing_workers': passwords.workers(),
+        'inline': _burst(inline, size),
+        'bounded': _burst(bounded, size),
+    }
+
+
+async def _asgi_get(application, path, query='', headers=()):
+    # One GET through the ASGI application, as a server would make it; returns the status
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': path, 'raw_path': path.encode(), 'query_string': query.encode(), 'root_path': '',
+        'headers': [(b'host', b'127.0.0.1'), *headers], 'client': ('127.0.0.1', 0), 'server': ('127.0.0.1', 80),
+    }
+    messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+    disconnected = asyncio.Event()
+    status = None
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        # The client stays connected until the response is sent
+        await disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+        elif not message.get('more_body'):
+            disconnected.set()
+
+    await application(scope, receive, send)
+    return status
+
+
+def _asgi_run(requests, connections, per_connection):
+    # Runs per_connection requests on each of connections concurrent
+    # connections; returns the results and the most threads seen at once
+    application = ASGIHandler()
+    latencies, statuses = [], {}
+    peak_threads = threading.active_count()
+
+    async def connection(offset):
+        nonlocal peak_threads
+        for i in range(per_connection):
+            path, query, headers = requests[(offset + i * connections) % len(requests)]
+            start = time.perf_counter()
+            status = await _asgi_get(application, path, query, headers)
+            latencies.append(time.perf_counter() - start)
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+            peak_threads = max(peak_threads, threading.active_count())
+
+    async def run():
+        await asyncio.gather(*(connection(offset) for offset in range(connections)))
+
+    start = time.perf_counter()
+    asyncio.run(run())
+    elapsed = time.perf_counter() - start
+    return {
+        'requests_per_sec': round(len(latencies) / elapsed, 1),
+        'statuses': statuses,
+        'peak_threads': peak_threads,
+        'latency': summarize(latencies),
+    }
+
+
+@scenario('asgi_concurrency')
+def asgi_concurrency(scale, repeat):
+    # The hot read endpoints through the ASGI application from `scale`
+    # concurrent connections (default 1000), served by the sync viewsets
+    # (a thread per request) and then by api/async_views.py. Needs the data
+    # the loadtest command seeds; run it once first.
+    connections = scale or 1000
+    per_connection = max(1, repeat // 250)
+    fixture = loadtest.Fixture(100)
+    authentication.clear()
+    rng = random.Random(0)
+    requests = []
+    for _ in range(500):
+        slug, page_number = rng.choice(fixture.pages)
+        token = [(b'authorization', f'Token {rng.choice(fixture.users)[1]}'.encode())]
+        requests += [
+            ('/api/career-tracks/', '', ()),
+            (f'/api/career-tracks/{slug}/', '', ()),
+            (f'/api/career-tracks/{slug}/learning_page/', f'page={page_number}', ()),
+            ('/api/interests/', '', ()),
+            ('/api/users/me/', '', token),
+        ]
+    rng.shuffle(requests)
+
+    results = {'connections': connections, 'requests_per_connection': per_connection}
+    for name, urlconf in (('sync', 'career_craft.urls'), ('async', 'career_craft.asgi_urls')):
+        with override_settings(ROOT_URLCONF=urlconf):
+            # Warm the page and token caches first, as a running server would have
+            _asgi_run(requests, 50, len(requests) // 50)
+            results[name] = _asgi_run(requests, connections, per_connection)
+    results['speedup'] = round(results['async']['requests_per_sec'] / results['sync']['requests_per_sec'], 2)
+    return results
@@ -0,0 +1,189 @@
+import json
+from itertools import islice
+from .models import (
+    Interest, CareerTrack, LearningPage, PageSection,
+    PhaseTwoFunFact, PhaseTwoDayInLife, PhaseTwoScenario, PhaseTwoReflection
+)
+
+# The learning catalogue as NDJSON, for moving authored content between
+# environments. An export is a stream of records, one per line: interests,
+# then tracks, then one record per learning page with its sections and Phase 2
+# content nested in it. Both directions work in chunks, so memory stays flat
+# however big the catalogue is. Imports are upserts keyed on interest name,
+# track slug and (track, page number); a page's content is replaced with what
+# the record holds.
+
+# Nested page content: record key -> model
+PAGE_CONTENT = {
+    'sections': PageSection,
+    'fun_facts': PhaseTwoFunFact,
+    'scenarios': PhaseTwoScenario,
+    'reflections': PhaseTwoReflection,
+}
+
+TRACK_FIELDS = ['slug', 'title', 'emoji', 'description', 'avg_salary', 'roadmap']
+
+
+def content_fields(model):
+    return [
+        field.name for field in model._meta.concrete_fields
+        if not field.primary_key and field.name != 'learning_page'
+    ]
+
+
+def _values(obj, fields):
+    return {name: getattr(obj, name) for name in fields}
+
+
+def export_records(chunk_size=500):
+    for name, emoji in Interest.objects.order_by('pk').values_list('name', 'emoji').iterator(chunk_size=chunk_size):
+        yield {'type': 'interest', 'name': name, 'emoji': emoji}
+
+    tracks = CareerTrack.objects.order_by('pk').prefetch_related('relevant_interests')
+    for track in tracks.iterator(chunk_size=chunk_size):
+        yield {
+            'type': 'track',
+            **_values(track, TRACK_FIELDS),
+            'interests': sorted(interest.name for interest in track.relevant_interests.all()),
+        }
+
+    # Pages are read in chunks and each chunk's content with one .values()
+    # query per model; building model instances for every child row costs
+    # several times more than the queries
+    fields = {model: content_fields(model) for model in PAGE_CONTENT.values()}
+    pages = (
+        LearningPage.objects.order_by('career_track_id', 'page_number', 'pk')
+        .values_list('pk', 'career_track__slug', 'page_number', 'day_in_life__narrative')
+        .iterator(chunk_size=chunk_size)
+    )
+    while chunk := list(islice(pages, chunk_size)):
+        children = {}
+        for key, model in PAGE_CONTENT.items():
+            rows = model.objects.filter(learning_page_id__in=[row[0] for row in chunk]).order_by('pk')
+            for row in rows.values('learning_page_id', *fields[model]):
+                children.setdefault((row.pop('learning_page_id'), key), []).append(row)
+        for page_id, slug, page_number, narrative in chunk:
+            record = {'type': 'page', 'track': slug, 'page_number': page_number}
+            for key in PAGE_CONTENT:
+                record[key] = children.get((page_id, key), [])
+            record['day_in_life'] = None if narrative is None else {'narrative': narrative}
+            yield record
+
+
+def write_records(stream, records):
+    count = 0
+    for record in records:
+        stream.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+        count += 1
+    return count
+
+
+class ContentImporter:
+    # Loads a batch of export records through a BulkLoader. Track slugs are
+    # remembered across batches so page records only look up new ones.
+
+    def __init__(self, loader):
+        self.loader = loader
+        self.track_ids = {}
+
+    def load(self, records):
+        by_type = {}
+        for record in records:
+            by_type.setdefault(record['type'], []).append(record)
+        unknown = set(by_type) - {'interest', 'track', 'page'}
+        if unknown:
+            raise ValueError(f'Unknown record type: {", ".join(sorted(unknown))}')
+        if 'interest' in by_type:
+            self.load_interests(by_type['interest'])
+        if 'track' in by_type:
+            self.load_tracks(by_type['track'])
+        if 'page' in by_type:
+            self.load_pages(by_type['page'])
+
+    def load_interests(self, records):
+        self.loader.insert(
+            Interest, [Interest(name=record['name'], emoji=record.get('emoji')) for record in records],
+            update_conflicts=True, unique_fields=['name'], update_fields=['emoji']
+        )
+
+    def load_tracks(self, records):
+        self.loader.insert(
+            CareerTrack, [CareerTrack(**{name: record.get(name) for name in TRACK_FIELDS}) for record in records],
+            update_conflicts=True, unique_fields=['slug'], update_fields=TRACK_FIELDS[1:]
+        )
+        slugs = [record['slug'] for record in records]
+        self.track_ids.update(CareerTrack.objects.filter(slug__in=slugs).values_list('slug', 'pk'))
+        interests = self.loader.load_interests(name for record in records for name in record.get('interests', []))
+        self.loader.set_interests({
+            self.track_ids[record['slug']]: [interests[name] for name in record.get('interests', [])]
+            for record in records
+        })
+
+    def _track_id(self, slug):
+        if slug not in self.track_ids:
+            raise ValueError(f'Page record for unknown track "{slug}"')
+        return self.track_ids[slug]
+
+    def load_pages(self, records):
+        missing = {record['track'] for record in records} - set(self.track_ids)
+        if missing:
+            self.track_ids.update(CareerTrack.objects.filter(slug__in=missing).values_list('slug', 'pk'))
+        keys = [(self._track_id(record['track']), record['page_number']) for record in records]
+
+        # Pages have no unique constraint on (track, page_number), so existing
+        # ones are matched by hand, the oldest first
+        pages = {}
+        existing = (
+            LearningPage.objects.filter(career_track_id__in={track_id for track_id, _ in keys})
+            .order_by('-pk').values_list('career_track_id', 'page_number', 'pk')
+        )
+        for track_id, page_number, pk in existing:
+            pages[(track_id, page_number)] = pk
+        new = [
+            LearningPage(career_track_id=track_id, page_number=page_number)
+            for track_id, page_number in dict.fromkeys(keys) if (track_id, page_number) not in pages
+        ]
+        for page in self.loader.insert(LearningPage, new):
+            pages[(page.career_track_id, page.page_number)] = page.pk
+        page_ids = [pages[key] for key in keys]
+
+        # Sections and the day in the life are unique per page and upserted
+        # in place; the other content is replaced wholesale
+        sections = [
+            PageSection(learning_page_id=page_id, **section)
+            for page_id, record in zip(page_ids, records)
+            for section in record.get('sections', [])
+        ]
+        kept = {(section.learning_page_id, section.section_type) for section in sections}
+        stale = [
+            pk for pk, page_id, section_type in
+            PageSection.objects.filter(learning_page_id__in=page_ids).values_list('pk', 'learning_page_id', 'section_type')
+            if (page_id, section_type) not in kept
+        ]
+        PageSection.objects.filter(pk__in=stale).delete()
+        self.loader.insert(
+            PageSection, sections,
+            update_conflicts=True, unique_fields=['learning_page', 'section_type'], update_fields=['content', 'order']
+        )
+
+        days = [
+            PhaseTwoDayInLife(learning_page_id=page_id, **record['day_in_life'])
+            for page_id, record in zip(page_ids, records) if record.get('day_in_life')
+        ]
+        PhaseTwoDayInLife.objects.filter(learning_page_id__in=page_ids).exclude(
+            learning_page_id__in=[day.learning_page_id for day in days]
+        ).delete()
+        self.loader.insert(
+            PhaseTwoDayInLife, days,
+            update_conflicts=True, unique_fields=['learning_page'], update_fields=['narrative']
+        )
+
+        for key, model in PAGE_CONTENT.items():
+            if model is PageSection:
+                continue
+            model.objects.filter(learning_page_id__in=page_ids).delete()
+            self.loader.insert(model, (
+                model(learning_page_id=page_id, **child)
+                for page_id, record in zip(page_ids, records)
+                for child in record.get(key, [])
+            ))
@@ -0,0 +1,136 @@
+from .models import (
+    CareerTrack, PageSection,
+    PhaseTwoFunFact, PhaseTwoScenario, PhaseTwoReflection
+)
+
+# Read-only payloads for the hot GET endpoints, built straight from .values()
+# rows instead of model instances and DRF fields. Each function returns the
+# same data as the matching serializer in serializers.py, key for key and in
+# the same order, so the rendered JSON is byte-identical (tests.py compares
+# the two). Related rows come back in primary key order, sections by their
+# order field. Anything that changes a serializer's fields must change the
+# field lists here too. The a-prefixed variants run the same queries on the
+# async ORM, for api/async_views.py.
+
+INTEREST_FIELDS = ['id', 'name', 'emoji']
+CAREER_TRACK_FIELDS = ['id', 'slug', 'title', 'emoji', 'description', 'avg_salary']
+USER_FIELDS = ['id', 'username', 'email', 'interests', 'selected_career_paths', 'onboarding_complete', 'xp']
+
+# LearningPageSerializer's nested lists: key -> (model, fields, ordering)
+PAGE_CONTENT = {
+    'sections': (PageSection, ['id', 'section_type', 'content', 'order'], ['order', 'pk']),
+    'fun_facts': (PhaseTwoFunFact, ['id', 'title', 'fact_text', 'takeaway'], ['pk']),
+    'scenarios': (
+        PhaseTwoScenario,
+        ['id', 'question', 'option_a', 'option_b', 'option_c', 'correct_option', 'explanation'],
+        ['pk'],
+    ),
+    'reflections': (PhaseTwoReflection, ['id', 'question_text', 'option_1', 'option_2', 'option_3'], ['pk']),
+}
+DAY_IN_LIFE_FIELDS = ['id', 'narrative']
+
+
+def _interest_rows(track_ids):
+    Through = CareerTrack.relevant_interests.through
+    return (
+        Through.objects.filter(careertrack_id__in=track_ids).order_by('interest_id')
+        .values_list('careertrack_id', *[f'interest__{name}' for name in INTEREST_FIELDS])
+    )
+
+
+def _with_interests(tracks, interest_rows):
+    interests = {}
+    for track_id, *values in interest_rows:
+        interests.setdefault(track_id, []).append(dict(zip(INTEREST_FIELDS, values)))
+    for track in tracks:
+        track['relevant_interests'] = interests.get(track['id'], [])
+    return tracks
+
+
+def career_tracks(queryset):
+    # CareerTrackSerializer(many=True) for a queryset, in two queries
+    tracks = list(queryset.values(*CAREER_TRACK_FIELDS))
+    return _with_interests(tracks, _interest_rows([track['id'] for track in tracks]))
+
+
+async def acareer_tracks(queryset):
+    # career_tracks() on the async ORM
+    tracks = [track async for track in queryset.values(*CAREER_TRACK_FIELDS)]
+    rows = [row async for row in _interest_rows([track['id'] for track in tracks])]
+    return _with_interests(tracks, rows)
+
+
+def career_tracks_by_id(track_ids):
+    # The same for a list of ids, keeping their order and skipping ids that
+    # no longer exist
+    tracks = {track['id']: track for track in career_tracks(CareerTrack.objects.filter(pk__in=track_ids))}
+    return [tracks[track_id] for track_id in track_ids if track_id in tracks]
+
+
+def _page_rows(queryset):
+    # The pages joined with their day in the life
+    return queryset.values_list('id', 'page_number', *[f'day_in_life__{name}' for name in DAY_IN_LIFE_FIELDS])
+
+
+def _content_rows(page_ids):
+    # (key, fields, rows) for each nested list, one query each
+    for key, (model, fields, ordering) in PAGE_CONTENT.items():
+        rows = model.objects.filter(learning_page_id__in=page_ids).order_by(*ordering)
+        yield key, fields, rows.values_list('learning_page_id', *fields)
+
+
+def _pages(page_rows):
+    pages = []
+    for page_id, page_number, *day_in_life in page_rows:
+        page = {'id': page_id, 'page_number': page_number}
+        page['day_in_life'] = None if day_in_life[0] is None else dict(zip(DAY_IN_LIFE_FIELDS, day_in_life))
+        pages.append(page)
+    return pages
+
+
+def _with_content(pages, content_rows):
+    content = {}
+    for key, fields, rows in content_rows:
+        for page_id, *values in rows:
+            content.setdefault((page_id, key), []).append(dict(zip(fields, values)))
+
+    # Keys in the serializer's field order
+    return [
+        {
+            'id': page['id'],
+            'page_number': page['page_number'],
+            'sections': content.get((page['id'], 'sections'), []),
+            'fun_facts': content.get((page['id'], 'fun_facts'), []),
+            'day_in_life': page['day_in_life'],
+            'scenarios': content.get((page['id'], 'scenarios'), []),
+            'reflections': content.get((page['id'], 'reflections'), []),
+        }
+        for page in pages
+    ]
+
+
+def learning_pages(queryset):
+    # LearningPageSerializer(many=True) for a queryset: the pages joined with
+    # their day in the life, then one query per nested list
+    pages = _pages(_page_rows(queryset))
+    return _with_content(pages, _content_rows([page['id'] for page in pages]))
+
+
+async def alearning_pages(queryset):
+    # learning_pages() on the async ORM
+    pages = _pages([row async for row in _page_rows(queryset)])
+    content_rows = [
+        (key, fields, [row async for row in rows])
+        for key, fields, rows in _content_rows([page['id'] for page in pages])
+    ]
+    return _with_content(pages, content_rows)
+
+
+async def ainterests(queryset):
+    # InterestSerializer(many=True) for a queryset, on the async ORM
+    return [interest async for interest in queryset.values(*INTEREST_FIELDS)]
+
+
+def user(user):
+    # UserSerializer for a loaded user; no queries
+    return {name: getattr(user, name) for name in USER_FIELDS}
@@ -0,0 +1,83 @@
+import time
+import uuid
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+# Generations: stamps in the default cache that tell a worker whether what it
+# built from the database (an index in memory, or cache entries namespaced
+# by the stamp) is still current. Readers compare the stamp they built under
+# with the current one; writers replace it, now and again once the
+# surrounding transaction commits, so a reader that rebuilt from the
+# pre-commit rows in between is retired too. A stamp the cache has lost
+# comes back as a new one, which retires everything built under the old.
+#
+# A stamp only reaches the workers that read the same cache. With the
+# default per-process cache (settings.CACHE_SHARED off, see
+# career_craft/caches.py) a save on one worker, or in a management command,
+# retires nothing anywhere else, so callers keep what they build for no
+# longer than max_age() allows.
+
+
+def shared():
+    # Whether every worker sees the same stamps
+    return getattr(settings, 'CACHE_SHARED', False)
+
+
+def max_age(seconds=None):
+    # Seconds to keep something built under a stamp, given how long the
+    # caller would keep it if invalidation reached every worker (None: until
+    # invalidated)
+    if shared():
+        return seconds
+    local = getattr(settings, 'UNSHARED_CACHE_TIMEOUT', 60)
+    return local if seconds is None else min(seconds, local)
+
+
+async def acall(func, *args):
+    # func(*args), for async code calling into the default cache: a shared
+    # cache is a network round trip, so the call runs on a thread, while the
+    # per-process cache answers from memory on the event loop
+    if shared():
+        return await sync_to_async(func, thread_sensitive=False)(*args)
+    return func(*args)
+
+
+def outlived(built_at, seconds=None):
+    # Whether something built at time.monotonic() built_at is past max_age()
+    age = max_age(seconds)
+    return age is not None and time.monotonic() - built_at > age
+
+
+class Generation:
+    def __init__(self, key, store=None):
+        self.key = key
+        # A cache other than the default one, for tests
+        self.store = store
+
+    @property
+    def cache(self):
+        return cache if self.store is None else self.store
+
+    def get(self):
+        return current(self)[0]
+
+    def _replace(self):
+        self.cache.set(self.key, uuid.uuid4().hex, None)
+
+    def bump(self):
+        self._replace()
+        transaction.on_commit(self._replace)
+
+
+def current(*generations):
+    # The stamps of generations kept in the same cache, in one round trip
+    store = generations[0].cache
+    keys = [generation.key for generation in generations]
+    values = store.get_many(keys)
+    for key in keys:
+        if key not in values:
+            store.add(key, uuid.uuid4().hex, None)
+            values[key] = store.get(key)
+    return tuple(values[key] for key in keys)
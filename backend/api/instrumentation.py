@@ -0,0 +1,263 @@
+import bisect
+import contextvars
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+# Per-request cost accounting. Every database connection carries an
+# execute_wrapper that records query count and database time against the
+# current request's metrics, found through a context variable so that the
+# queries async views run on worker threads are counted too.
+# InstrumentationMiddleware (sync or async) sets them up per request,
+# serializers add the time spent building .data and FastJSONRenderer its
+# rendering time. With INSTRUMENTATION_SERVER_TIMING on, the totals go out in
+# a Server-Timing header; each route also feeds per-worker histograms that
+# staff can read at /api/metrics/. A request that
+# runs the same SQL shape more than INSTRUMENTATION_N_PLUS_ONE_THRESHOLD times
+# is logged as a likely N+1.
+#
+# Queries run while a streamed response is being sent happen after the
+# middleware returns and are not counted.
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds: milliseconds for latency, counts for queries
+LATENCY_BUCKETS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+QUERY_BUCKETS = [0, 1, 2, 3, 5, 10, 20, 50, 100, 200]
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+_lock = threading.Lock()
+_routes = {}
+
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+def sql_shape(sql):
+    # SQL with literals and IN-list lengths folded away, so the same query
+    # for different rows has the same shape
+    return _LITERALS.sub('?', _IN_LIST.sub('IN (...)', sql))
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self.render_seconds = 0.0
+        self.shapes = {}
+        # Nesting depth of serializing() blocks
+        self.serializing = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # execute_wrapper hook
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - start
+            self.queries += 1
+            shape = sql_shape(sql)
+            self.shapes[shape] = self.shapes.get(shape, 0) + 1
+
+    def repeated(self, threshold):
+        # {shape: count} for shapes run more than threshold times
+        return {shape: count for shape, count in self.shapes.items() if count > threshold}
+
+    def server_timing(self, total_seconds):
+        app_seconds = max(total_seconds - self.db_seconds - self.serialize_seconds - self.render_seconds, 0.0)
+        return ', '.join([
+            f'db;dur={self.db_seconds * 1000:.2f};desc="{self.queries} queries"',
+            f'serialize;dur={self.serialize_seconds * 1000:.2f}',
+            f'render;dur={self.render_seconds * 1000:.2f}',
+            f'app;dur={app_seconds * 1000:.2f}',
+            f'total;dur={total_seconds * 1000:.2f}',
+        ])
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self):
+        # Cumulative counts per upper bound, Prometheus style
+        cumulative, running = {}, 0
+        for bound, count in zip([*self.buckets, '+Inf'], self.counts):
+            running += count
+            cumulative[str(bound)] = running
+        return {'count': self.count, 'sum': round(self.sum, 3), 'buckets': cumulative}
+
+
+class RouteStats:
+    def __init__(self):
+        self.latency_ms = Histogram(LATENCY_BUCKETS)
+        self.db_ms = Histogram(LATENCY_BUCKETS)
+        self.serialize_ms = Histogram(LATENCY_BUCKETS)
+        self.render_ms = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.statuses = {}
+
+    def observe(self, metrics, total_seconds, status):
+        self.latency_ms.observe(total_seconds * 1000)
+        self.db_ms.observe(metrics.db_seconds * 1000)
+        self.serialize_ms.observe(metrics.serialize_seconds * 1000)
+        self.render_ms.observe(metrics.render_seconds * 1000)
+        self.queries.observe(metrics.queries)
+        self.statuses[str(status)] = self.statuses.get(str(status), 0) + 1
+
+    def snapshot(self):
+        return {
+            'requests': self.latency_ms.count,
+            'statuses': dict(self.statuses),
+            'latency_ms': self.latency_ms.snapshot(),
+            'db_ms': self.db_ms.snapshot(),
+            'serialize_ms': self.serialize_ms.snapshot(),
+            'render_ms': self.render_ms.snapshot(),
+            'queries': self.queries.snapshot(),
+        }
+
+
+def _dispatch(execute, sql, params, many, context):
+    # The execute_wrapper on every connection
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics(execute, sql, params, many, context)
+
+
+def install(connection):
+    if _dispatch not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_dispatch)
+
+
+def _connection_created(sender, connection, **kwargs):
+    install(connection)
+
+
+connection_created.connect(_connection_created)
+
+
+@contextmanager
+def recording():
+    # Records queries on every connection for the block, including those of
+    # sync_to_async threads it starts; yields the metrics
+    metrics = RequestMetrics()
+    for connection in connections.all():
+        install(connection)
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def serializing():
+    # Counts the block as serialize time for the current request, if any,
+    # less the queries it runs (lazy querysets are evaluated in .data).
+    # Nested blocks count once.
+    metrics = _current.get()
+    if metrics is None or metrics.serializing:
+        yield
+        return
+    metrics.serializing += 1
+    start, db_seconds = time.perf_counter(), metrics.db_seconds
+    try:
+        yield
+    finally:
+        metrics.serializing -= 1
+        elapsed = time.perf_counter() - start - (metrics.db_seconds - db_seconds)
+        metrics.serialize_seconds += max(elapsed, 0.0)
+
+
+@contextmanager
+def rendering():
+    # Counts the block as render time for the current request, if any
+    metrics = _current.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            metrics.render_seconds += time.perf_counter() - start
+
+
+def route_name(request):
+    # "GET career-track-learning-page"; URL names are steadier than patterns
+    match = getattr(request, 'resolver_match', None)
+    return f'{request.method} {match.view_name if match is not None else "unresolved"}'
+
+
+def observe(route, metrics, total_seconds, status):
+    with _lock:
+        stats = _routes.get(route)
+        if stats is None:
+            stats = _routes[route] = RouteStats()
+        stats.observe(metrics, total_seconds, status)
+
+
+def snapshot():
+    with _lock:
+        return {route: stats.snapshot() for route, stats in sorted(_routes.items())}
+
+
+def reset():
+    with _lock:
+        _routes.clear()
+
+
+def report_repeated_queries(route, metrics):
+    threshold = getattr(settings, 'INSTRUMENTATION_N_PLUS_ONE_THRESHOLD', 10)
+    for shape, count in metrics.repeated(threshold).items():
+        logger.warning('Possible N+1 on %s: query ran %d times: %s', route, count, shape)
+
+
+class InstrumentationMiddleware:
+    # Async-capable, so that under ASGI async views don't pay a thread hop
+    # for it
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with recording() as metrics:
+            response = self.get_response(request)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        with recording() as metrics:
+            response = await self.get_response(request)
+        return self.finish(request, response, metrics)
+
+    def finish(self, request, response, metrics):
+        total_seconds = time.perf_counter() - metrics.started
+
+        route = route_name(request)
+        # Off by default: query counts and timings tell any client a lot
+        # about the server
+        if getattr(settings, 'INSTRUMENTATION_SERVER_TIMING', False):
+            response['Server-Timing'] = metrics.server_timing(total_seconds)
+        observe(route, metrics, total_seconds, response.status_code)
+        report_repeated_queries(route, metrics)
+        return response
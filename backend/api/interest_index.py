@@ -0,0 +1,92 @@
+import threading
+import time
+from . import generations
+from .models import CareerTrack, Interest
+
+# Per-worker inverted index of Interest -> CareerTrack, built once and rebuilt
+# lazily when edits bump its version (a generation, see api/generations.py).
+
+version = generations.Generation('interest_index:version')
+
+_lock = threading.Lock()
+_index = None
+
+
+class InterestIndex:
+    def __init__(self, version, interest_ids, track_ids, memberships):
+        self.version = version
+        self.built_at = time.monotonic()
+        # Interest name -> interest id, and interest id -> bit position
+        self.interest_ids = interest_ids
+        self.interest_bits = {interest_id: bit for bit, interest_id in enumerate(sorted(interest_ids.values()))}
+        # Tracks are kept in id order, so a lower position also wins ties
+        self.track_ids = track_ids
+        self.track_positions = {track_id: position for position, track_id in enumerate(track_ids)}
+        # Interest id -> bitset of track positions, track position -> bitset of interests
+        self.interest_tracks = {}
+        self.track_interests = [0] * len(track_ids)
+        for track_id, interest_id in memberships:
+            position = self.track_positions[track_id]
+            self.interest_tracks[interest_id] = self.interest_tracks.get(interest_id, 0) | (1 << position)
+            self.track_interests[position] |= 1 << self.interest_bits[interest_id]
+
+    def interest_mask(self, interest_names):
+        mask = 0
+        for name in interest_names:
+            interest_id = self.interest_ids.get(name)
+            if interest_id is not None:
+                mask |= 1 << self.interest_bits[interest_id]
+        return mask
+
+    def candidates(self, interest_names):
+        # Bitset of track positions sharing at least one of the interests
+        tracks = 0
+        for name in interest_names:
+            tracks |= self.interest_tracks.get(self.interest_ids.get(name), 0)
+        return tracks
+
+    def rank(self, interest_names, limit=None):
+        # Returns [(track_id, score), ...] best match first, ties broken by id
+        mask = self.interest_mask(interest_names)
+        candidates = self.candidates(interest_names)
+        scores = []
+        while candidates:
+            lowest = candidates & -candidates
+            position = lowest.bit_length() - 1
+            candidates ^= lowest
+            score = (self.track_interests[position] & mask).bit_count()
+            scores.append((-score, position))
+        scores.sort()
+        if limit is not None:
+            scores = scores[:limit]
+        return [(self.track_ids[position], -score) for score, position in scores]
+
+
+def build_index(version):
+    interest_ids = dict(Interest.objects.values_list('name', 'id'))
+    Membership = CareerTrack.relevant_interests.through
+    memberships = list(Membership.objects.values_list('careertrack_id', 'interest_id'))
+    track_ids = sorted({track_id for track_id, _ in memberships})
+    return InterestIndex(version, interest_ids, track_ids, memberships)
+
+
+def _stale(index, current):
+    return index is None or index.version != current or generations.outlived(index.built_at)
+
+
+def get_index():
+    global _index
+    # Read the version before querying, so a change that lands while we
+    # build leaves this index stale instead of current
+    current = version.get()
+    index = _index
+    if _stale(index, current):
+        with _lock:
+            if _stale(_index, current):
+                _index = build_index(current)
+            index = _index
+    return index
+
+
+def invalidate():
+    version.bump()
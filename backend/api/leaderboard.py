@@ -0,0 +1,252 @@
+import bisect
+import threading
+import time
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from . import generations, xp_buffer
+from .models import Progress
+
+# Per-worker leaderboards, one global (CustomUser.xp) and one per career track
+# (Progress.xp). Each keeps (-xp, user_id) keys in sorted order, so rank,
+# top-N and "around me" are O(log n) lookups plus a short scan. Boards are
+# built lazily from the database, updated in place whenever scoring changes
+# XP, and rebuilt outside _lock when older than LEADERBOARD_REFRESH_INTERVAL
+# or when rebuild_leaderboard bumps the generation (api/generations.py).
+
+CustomUser = get_user_model()
+
+generation = generations.Generation('leaderboard:generation')
+
+_lock = threading.Lock()
+_boards = {}
+# One rebuild at a time; career_id -> moves recorded while it is rebuilding
+_build_lock = threading.Lock()
+_building = {}
+
+
+class SortedIndex:
+    # (-xp, user_id) keys split into sorted blocks of roughly BLOCK_SIZE, with
+    # a Fenwick tree over block lengths. Finding a key is a bisect over the
+    # block maxima plus one inside a block, and its rank is a Fenwick prefix
+    # sum, so updates and lookups stay O(log n) with only small memmoves.
+    BLOCK_SIZE = 1000
+
+    def __init__(self, scores=()):
+        self.scores = dict(scores)
+        keys = sorted((-xp, user_id) for user_id, xp in self.scores.items())
+        self.blocks = [keys[i:i + self.BLOCK_SIZE] for i in range(0, len(keys), self.BLOCK_SIZE)]
+        self._reindex()
+
+    def __len__(self):
+        return len(self.scores)
+
+    def _reindex(self):
+        self.maxes = [block[-1] for block in self.blocks]
+        self.tree = [0] * (len(self.blocks) + 1)
+        for i, block in enumerate(self.blocks, 1):
+            self.tree[i] += len(block)
+            parent = i + (i & -i)
+            if parent <= len(self.blocks):
+                self.tree[parent] += self.tree[i]
+
+    def _grow(self, block, amount):
+        i = block + 1
+        while i < len(self.tree):
+            self.tree[i] += amount
+            i += i & -i
+
+    def _before(self, block):
+        # Number of keys in the blocks ahead of this one
+        total, i = 0, block
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def _locate(self, position):
+        # (block, offset) holding the key at a position
+        block, step = 0, 1 << len(self.tree).bit_length()
+        while step:
+            if block + step < len(self.tree) and self.tree[block + step] <= position:
+                block += step
+                position -= self.tree[block]
+            step >>= 1
+        return block, position
+
+    def _insert(self, key):
+        if not self.blocks:
+            self.blocks.append([key])
+            self._reindex()
+            return
+        block = min(bisect.bisect_left(self.maxes, key), len(self.blocks) - 1)
+        bisect.insort(self.blocks[block], key)
+        self.maxes[block] = self.blocks[block][-1]
+        if len(self.blocks[block]) > 2 * self.BLOCK_SIZE:
+            half = self.blocks[block][self.BLOCK_SIZE:]
+            del self.blocks[block][self.BLOCK_SIZE:]
+            self.blocks.insert(block + 1, half)
+            self._reindex()
+        else:
+            self._grow(block, 1)
+
+    def _delete(self, key):
+        block = bisect.bisect_left(self.maxes, key)
+        del self.blocks[block][bisect.bisect_left(self.blocks[block], key)]
+        if self.blocks[block]:
+            self.maxes[block] = self.blocks[block][-1]
+            self._grow(block, -1)
+        else:
+            del self.blocks[block]
+            self._reindex()
+
+    def update(self, user_id, xp):
+        old = self.scores.get(user_id)
+        if old == xp:
+            return
+        if old is not None:
+            self._delete((-old, user_id))
+        self.scores[user_id] = xp
+        self._insert((-xp, user_id))
+
+    def remove(self, user_id):
+        old = self.scores.pop(user_id, None)
+        if old is not None:
+            self._delete((-old, user_id))
+
+    def position(self, user_id):
+        xp = self.scores.get(user_id)
+        if xp is None:
+            return None
+        key = (-xp, user_id)
+        block = bisect.bisect_left(self.maxes, key)
+        return self._before(block) + bisect.bisect_left(self.blocks[block], key)
+
+    def entries(self, start, stop):
+        # [(rank, user_id, xp), ...] for positions start..stop
+        start, stop = max(start, 0), min(stop, len(self))
+        entries = []
+        if start >= stop:
+            return entries
+        block, offset = self._locate(start)
+        rank = start + 1
+        while rank <= stop:
+            negative_xp, user_id = self.blocks[block][offset]
+            entries.append((rank, user_id, -negative_xp))
+            rank += 1
+            offset += 1
+            if offset == len(self.blocks[block]):
+                block, offset = block + 1, 0
+        return entries
+
+    def top(self, limit):
+        return self.entries(0, limit)
+
+    def rank(self, user_id):
+        position = self.position(user_id)
+        return None if position is None else position + 1
+
+    def around(self, user_id, radius):
+        position = self.position(user_id)
+        if position is None:
+            return []
+        return self.entries(position - radius, position + radius + 1)
+
+
+class Board:
+    def __init__(self, index, generation):
+        self.index = index
+        self.generation = generation
+        self.built_at = time.monotonic()
+
+
+def load(career_id=None):
+    if career_id is None:
+        scores = CustomUser.objects.values_list('id', 'xp')
+    else:
+        scores = Progress.objects.filter(career_id=career_id).values_list('user_id', 'xp')
+
+    def read():
+        return SortedIndex(scores.iterator(chunk_size=10000))
+
+    if xp_buffer.enabled():
+        # Write-behind XP this worker hasn't flushed yet counts too
+        return xp_buffer.overlay_scores(read, career_id)
+    return read()
+
+
+def _stale(board, current):
+    interval = getattr(settings, 'LEADERBOARD_REFRESH_INTERVAL', 60) or None
+    return board.generation != current or generations.outlived(board.built_at, interval)
+
+
+def get_board(career_id=None):
+    # The sorted index for the global board (career_id=None) or a track
+    current = generation.get()
+    board = _boards.get(career_id)
+    if board is not None and not _stale(board, current):
+        return board.index
+    # While another thread rebuilds, a stale board will do
+    if not _build_lock.acquire(blocking=board is None):
+        return board.index
+    try:
+        board = _boards.get(career_id)
+        if board is not None and not _stale(board, current):
+            return board.index
+        with _lock:
+            _building[career_id] = []
+        try:
+            index = load(career_id)
+        finally:
+            with _lock:
+                moves = _building.pop(career_id)
+        with _lock:
+            for user_id, xp in moves:
+                if xp is None:
+                    index.remove(user_id)
+                else:
+                    index.update(user_id, xp)
+            board = _boards[career_id] = Board(index, current)
+        return board.index
+    finally:
+        _build_lock.release()
+
+
+def top(limit, career_id=None):
+    index = get_board(career_id)
+    with _lock:
+        return index.top(limit)
+
+
+def standing(user_id, radius, career_id=None):
+    # (rank, neighbours) for the user, or (None, []) when not on the board
+    index = get_board(career_id)
+    with _lock:
+        return index.rank(user_id), index.around(user_id, radius)
+
+
+def record(user_id, xp, career_id=None):
+    # Moves the user on a board this worker has built; boards that were never
+    # read are left to load fresh from the database
+    with _lock:
+        board = _boards.get(career_id)
+        if board is not None:
+            board.index.update(user_id, xp)
+        if career_id in _building:
+            _building[career_id].append((user_id, xp))
+
+
+def remove(user_id, career_id=None):
+    with _lock:
+        board = _boards.get(career_id)
+        if board is not None:
+            board.index.remove(user_id)
+        if career_id in _building:
+            _building[career_id].append((user_id, None))
+
+
+def rebuild():
+    # Makes this worker, and every worker sharing the cache, reload its
+    # boards on next read
+    generation.bump()
+    with _lock:
+        _boards.clear()
@@ -0,0 +1,191 @@
+import gzip
+import json
+import time
+from itertools import islice
+from django.db import transaction
+from django.utils.text import slugify
+from . import interest_index, page_cache, sampling, scaffolding
+from .scaffolding import PHASE_TWO_TEMPLATES, SECTION_TEMPLATES
+from .models import Interest, CareerTrack, OnboardingQuestion, LearningPage, PhaseTwoDayInLife
+
+# Shared bulk loader for the seeding management commands. Records are read
+# lazily (JSON array or NDJSON), loaded in batches with one bulk insert per
+# model per batch, and each batch commits in its own transaction. Every
+# insert skips rows that already exist, so rerunning a load is a no-op.
+# bulk_create bypasses model signals, so the loader creates default page
+# content itself from the scaffolding templates (with the post_save
+# scaffolding suspended while it runs) and invalidates the derived caches
+# when it is done.
+
+
+def open_stream(path, mode='r'):
+    # Text stream for a path, gzipped when it ends in .gz
+    if str(path).endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def read_records(path):
+    # Yields records from a JSON array or an NDJSON file (one object per
+    # line), either of them optionally gzipped
+    with open_stream(path) as source:
+        first = source.read(1)
+        while first.isspace():
+            first = source.read(1)
+        source.seek(0)
+        if first == '[':
+            yield from json.load(source)
+            return
+        for line in source:
+            if line.strip():
+                yield json.loads(line)
+
+
+class BulkLoader:
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        self.counts = {}
+        self.started = time.perf_counter()
+
+    def batches(self, records):
+        records = iter(records)
+        while batch := list(islice(records, self.batch_size)):
+            yield batch
+
+    def run(self, records, load_batch):
+        # Calls load_batch for each batch of records, one transaction each
+        with scaffolding.suspended():
+            for batch in self.batches(records):
+                with transaction.atomic():
+                    load_batch(batch)
+
+    def insert(self, model, objs, **kwargs):
+        objs = list(objs)
+        if objs:
+            model.objects.bulk_create(objs, batch_size=self.batch_size, **kwargs)
+            self.counts[model.__name__] = self.counts.get(model.__name__, 0) + len(objs)
+        return objs
+
+    def insert_missing(self, model, objs, key, **kwargs):
+        # bulk_create for objects whose key isn't in the table yet. Works for
+        # keys without a unique constraint, and the created objects get pks.
+        objs = list(objs)
+        values = {getattr(obj, key) for obj in objs}
+        existing = set()
+        for chunk in self.batches(values):
+            existing.update(model.objects.filter(**{f'{key}__in': chunk}).values_list(key, flat=True))
+        missing, seen = [], set()
+        for obj in objs:
+            value = getattr(obj, key)
+            if value not in existing and value not in seen:
+                seen.add(value)
+                missing.append(obj)
+        return self.insert(model, missing, **kwargs)
+
+    def create_pages(self, pages_by_track):
+        # Creates pages 1..n for {track_id: n} where missing. Page 1 gets the
+        # sections and Phase 2 content new tracks get; later pages get the
+        # sections new pages get in the admin.
+        existing = set(
+            LearningPage.objects.filter(career_track_id__in=list(pages_by_track))
+            .values_list('career_track_id', 'page_number')
+        )
+        pages = self.insert(LearningPage, (
+            LearningPage(career_track_id=track_id, page_number=number)
+            for track_id, count in pages_by_track.items()
+            for number in range(1, count + 1)
+            if (track_id, number) not in existing
+        ))
+        self.insert_templates(SECTION_TEMPLATES, [page.pk for page in pages])
+        self.add_phase_two([page.pk for page in pages if page.page_number == 1])
+        return pages
+
+    def add_phase_two(self, page_ids):
+        # A page has at most one day in the life
+        taken = set(
+            PhaseTwoDayInLife.objects.filter(learning_page_id__in=page_ids).values_list('learning_page_id', flat=True)
+        )
+        templates = dict(PHASE_TWO_TEMPLATES)
+        day_in_life = templates.pop(PhaseTwoDayInLife)
+        self.insert_templates(templates, page_ids)
+        self.insert_templates({PhaseTwoDayInLife: day_in_life}, [pk for pk in page_ids if pk not in taken])
+
+    def insert_templates(self, templates, page_ids):
+        # Inserts every template row of {model: [field values]} once per page
+        for batch in self.batches(page_ids):
+            scaffolding.scaffold(batch, templates)
+        for model, rows in templates.items():
+            self.counts[model.__name__] = self.counts.get(model.__name__, 0) + len(rows) * len(page_ids)
+
+    def load_interests(self, names):
+        # {name: pk}, creating interests that don't exist yet
+        names = set(names)
+        self.insert_missing(Interest, (Interest(name=name) for name in names), 'name')
+        return dict(Interest.objects.filter(name__in=names).values_list('name', 'pk'))
+
+    def load_tracks(self, records):
+        # Track records: {title, emoji, description, avg_salary, interests, pages}.
+        # Existing tracks keep their details; their interests are replaced and
+        # missing pages are added.
+        interests = self.load_interests(name for record in records for name in record.get('interests', []))
+        tracks = [
+            CareerTrack(
+                title=record['title'], slug=record.get('slug') or slugify(record['title']),
+                emoji=record.get('emoji'), description=record.get('description'),
+                avg_salary=record.get('avg_salary'), roadmap=record.get('roadmap', []),
+            )
+            for record in records
+        ]
+        # A slug taken by another title is skipped rather than failing the batch
+        self.insert_missing(CareerTrack, tracks, 'title', ignore_conflicts=True)
+        track_ids = dict(
+            CareerTrack.objects.filter(title__in=[track.title for track in tracks]).values_list('title', 'pk')
+        )
+        records = [record for record in records if record['title'] in track_ids]
+
+        self.set_interests({
+            track_ids[record['title']]: [interests[name] for name in record.get('interests', [])]
+            for record in records
+        })
+        self.create_pages({track_ids[record['title']]: record.get('pages', 1) for record in records})
+
+    def load_questions(self, records):
+        # Question records: {text, type, options, tags}, matched on text
+        self.insert_missing(OnboardingQuestion, (
+            OnboardingQuestion(
+                text=record['text'], type=record['type'],
+                options=record.get('options'), tags=record.get('tags', [])
+            )
+            for record in records
+        ), 'text')
+
+    def set_interests(self, interests_by_track):
+        # Same as relevant_interests.set() on each track of {track_id: [interest_id]}
+        Through = CareerTrack.relevant_interests.through
+        wanted = {
+            (track_id, interest_id)
+            for track_id, interest_ids in interests_by_track.items()
+            for interest_id in interest_ids
+        }
+        current = Through.objects.filter(careertrack_id__in=list(interests_by_track))
+        stale = [pk for pk, *pair in current.values_list('pk', 'careertrack_id', 'interest_id') if tuple(pair) not in wanted]
+        Through.objects.filter(pk__in=stale).delete()
+        existing = set(current.values_list('careertrack_id', 'interest_id'))
+        self.insert(Through, (
+            Through(careertrack_id=track_id, interest_id=interest_id)
+            for track_id, interest_id in sorted(wanted - existing)
+        ))
+
+    def invalidate_caches(self):
+        interest_index.invalidate()
+        page_cache.invalidate()
+        sampling.invalidate()
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started
+        total = sum(self.counts.values())
+        lines = [f'{name}: {count} rows' for name, count in self.counts.items()]
+        rate = round(total / elapsed) if elapsed else total
+        lines.append(f'{total} rows in {elapsed:.2f}s ({rate} rows/sec)')
+        return lines
+
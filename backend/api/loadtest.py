@@ -0,0 +1,468 @@
+import base64
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from contextlib import contextmanager, nullcontext
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from django.test.utils import override_settings
+from django.db import connection
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from . import leaderboard
+from .loader import BulkLoader
+from .models import CareerTrack, Interest, OnboardingQuestion, Question, Quiz, UserAnswer
+
+# Load test for the loadtest management command. Synthetic users, tracks,
+# pages, quizzes and onboarding answers are seeded at a given scale (through
+# the seeding commands where there is one), then concurrent clients drive
+# the real endpoints over HTTP, against an in-process threaded WSGI server
+# or a server given by URL that uses the same database. Every request is
+# timed and its query count read back from the Server-Timing header
+# InstrumentationMiddleware sets (INSTRUMENTATION_SERVER_TIMING, which the
+# in-process server turns on). The report is JSON, for comparing runs
+# across commits.
+#
+# Seeded rows are recognisable by their names (USER_PREFIX, TRACK_PREFIX),
+# reseeding only adds what is missing, and remove_seeded() deletes them.
+
+CustomUser = get_user_model()
+
+USER_PREFIX = 'loadtest'
+TRACK_PREFIX = 'Load track'
+PASSWORD = 'loadtest-password'
+QUESTIONS_PER_QUIZ = 3
+
+# Flow name -> relative weight; see FLOWS below
+DEFAULT_MIX = {'recommendations': 4, 'learning_page': 8, 'submit_answer': 4, 'onboarding': 1}
+# Named mixes for --mix; "writes" is every client writing all the time,
+# "signup" a class registering at once while others read
+MIXES = {
+    'default': DEFAULT_MIX,
+    'writes': {'submit_answer': 1, 'save_answers': 1},
+    'signup': {'register': 1, 'learning_page': 2},
+}
+
+_QUERIES = re.compile(r'desc="(\d+) queries"')
+_DB_DURATION = re.compile(r'\bdb;dur=([\d.]+)')
+
+
+def populate(users, tracks, pages, answers, seed=0, stdout=None):
+    # Seeds the synthetic data set; rerunning with the same arguments is a no-op
+    rng = random.Random(seed)
+    call_command('populate_career_data', stdout=stdout)
+    call_command('populate_questions', stdout=stdout)
+    interests = list(Interest.objects.order_by('pk').values_list('name', flat=True))
+
+    with tempfile.NamedTemporaryFile('w', suffix='.ndjson', encoding='utf-8', delete=False) as records:
+        for i in range(tracks):
+            records.write(json.dumps({
+                'title': f'{TRACK_PREFIX} {i}', 'emoji': '🚀', 'description': f'Synthetic track {i}',
+                'interests': rng.sample(interests, min(3, len(interests))), 'pages': pages,
+            }) + '\n')
+    try:
+        call_command('populate_career_data', from_file=records.name, stdout=stdout)
+    finally:
+        os.unlink(records.name)
+
+    loader = BulkLoader()
+    track_ids = list(CareerTrack.objects.filter(title__startswith=TRACK_PREFIX).values_list('pk', flat=True))
+    loader.insert(Quiz, (Quiz(career_id=track_id, day=1) for track_id in track_ids), ignore_conflicts=True)
+    loader.insert(Question, (
+        Question(
+            quiz_id=quiz_id, text=f'Question {n}',
+            options=[{'text': option, 'is_correct': option == 'A'} for option in 'ABCD'],
+        )
+        for quiz_id in Quiz.objects.filter(career_id__in=track_ids, questions__isnull=True).values_list('pk', flat=True)
+        for n in range(QUESTIONS_PER_QUIZ)
+    ))
+
+    # One hash for every user; hashing a password per row would take minutes
+    password = make_password(PASSWORD)
+    loader.insert(CustomUser, (
+        CustomUser(
+            username=f'{USER_PREFIX}{i}', email=f'{USER_PREFIX}{i}@example.com', password=password,
+            interests=rng.sample(interests, min(3, len(interests))), onboarding_complete=True,
+            date_joined=timezone.now(),
+        )
+        for i in range(users)
+    ), ignore_conflicts=True)
+    user_ids = list(CustomUser.objects.filter(username__startswith=USER_PREFIX).values_list('pk', flat=True))
+    with_token = set(Token.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True))
+    loader.insert(Token, (
+        Token(user_id=user_id, key=Token.generate_key()) for user_id in user_ids if user_id not in with_token
+    ))
+
+    questions = list(OnboardingQuestion.objects.values('pk', 'type', 'options'))
+    loader.insert(UserAnswer, (
+        UserAnswer(user_id=user_id, question_id=question['pk'], answer=answer_for(question, rng))
+        for user_id in user_ids
+        for question in rng.sample(questions, min(answers, len(questions)))
+    ), ignore_conflicts=True)
+    for line in loader.report():
+        if stdout is not None:
+            stdout.write(line)
+
+    call_command('backfill_skill_profiles', stdout=stdout)
+    call_command('rebuild_leaderboard', stdout=stdout)
+
+
+def remove_seeded():
+    CustomUser.objects.filter(username__startswith=USER_PREFIX).delete()
+    CareerTrack.objects.filter(title__startswith=TRACK_PREFIX).delete()
+    BulkLoader().invalidate_caches()
+    leaderboard.rebuild()
+
+
+def answer_for(question, rng):
+    # A valid answer to an onboarding question, given as a dict with type
+    # and options (an API response or a .values() row)
+    if question['type'] == 'yes_no':
+        return rng.random() < 0.5
+    if question['type'] == 'multi_choice' and question['options']:
+        return rng.choice(question['options'])
+    return rng.randint(1, 5)
+
+
+class Fixture:
+    # What the clients pick from: users (username, token), pages, quiz
+    # questions, interests
+    def __init__(self, users):
+        self.users = list(
+            Token.objects.filter(user__username__startswith=USER_PREFIX)
+            .order_by('user_id').values_list('user__username', 'key')[:users]
+        )
+        self.pages = list(
+            CareerTrack.objects.filter(title__startswith=TRACK_PREFIX, learning_pages__isnull=False)
+            .order_by('pk').values_list('slug', 'learning_pages__page_number')
+        )
+        self.questions = list(
+            Question.objects.filter(quiz__career__title__startswith=TRACK_PREFIX)
+            .order_by('pk').values_list('quiz_id', 'pk', 'options')
+        )
+        self.interests = list(Interest.objects.order_by('pk').values_list('name', flat=True))
+        self.onboarding_questions = list(OnboardingQuestion.objects.order_by('pk').values('pk', 'type', 'options'))
+        if not self.users or not self.pages or not self.questions:
+            raise ValueError('No load test data; run without --no-seed first')
+
+
+class Recorder:
+    # Per-endpoint and per-flow samples, shared by every client thread
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = {}
+        self.flows = {}
+
+    def request(self, endpoint, seconds, status, queries, db_ms):
+        with self.lock:
+            self.requests.setdefault(endpoint, []).append((seconds, status, queries, db_ms))
+
+    def flow(self, name, seconds):
+        with self.lock:
+            self.flows.setdefault(name, []).append(seconds)
+
+
+class Client:
+    # Signs requests in as a fixture user with their token, or with their
+    # username and password when auth is "basic"
+    def __init__(self, base_url, recorder, auth='token', timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.recorder = recorder
+        self.auth = auth
+        self.timeout = timeout
+
+    def authorization(self, user):
+        username, token = user
+        if self.auth == 'basic':
+            return 'Basic ' + base64.b64encode(f'{username}:{PASSWORD}'.encode()).decode()
+        return f'Token {token}'
+
+    def request(self, endpoint, method, path, user=None, data=None):
+        # Returns (status, parsed JSON body or None); status is None when
+        # the request didn't get a response at all
+        headers = {'Accept': 'application/json'}
+        body = None
+        if user:
+            headers['Authorization'] = self.authorization(user)
+        if data is not None:
+            headers['Content-Type'] = 'application/json'
+            body = json.dumps(data).encode()
+        request = urllib.request.Request(self.base_url + path, data=body, headers=headers, method=method)
+
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                status, timing, content = response.status, response.headers.get('Server-Timing', ''), response.read()
+        except urllib.error.HTTPError as e:
+            status, timing, content = e.code, e.headers.get('Server-Timing', ''), e.read()
+        except OSError:
+            status, timing, content = None, '', b''
+        seconds = time.perf_counter() - start
+
+        queries, db_ms = _QUERIES.search(timing), _DB_DURATION.search(timing)
+        self.recorder.request(
+            endpoint, seconds, status,
+            int(queries.group(1)) if queries else None, float(db_ms.group(1)) if db_ms else None,
+        )
+        try:
+            return status, json.loads(content) if content else None
+        except ValueError:
+            return status, None
+
+
+# Flows: what one simulated user does in one go
+
+def recommendations_flow(client, fixture, rng):
+    client.request('recommendations', 'GET', '/api/users/recommendations/', rng.choice(fixture.users))
+
+
+def learning_page_flow(client, fixture, rng):
+    slug, page_number = rng.choice(fixture.pages)
+    client.request(
+        'learning_page', 'GET', f'/api/career-tracks/{slug}/learning_page/?page={page_number}',
+        rng.choice(fixture.users)
+    )
+
+
+def submit_answer_flow(client, fixture, rng):
+    quiz_id, question_id, options = rng.choice(fixture.questions)
+    client.request(
+        'submit_answer', 'POST', f'/api/quizzes/{quiz_id}/submit_answer/', rng.choice(fixture.users),
+        {'question': question_id, 'answer': rng.choice(options)['text']}
+    )
+
+
+def onboarding_flow(client, fixture, rng):
+    # The onboarding pages in order: interests, questionnaire, recommendations
+    user = rng.choice(fixture.users)
+    client.request('interests', 'GET', '/api/interests/')
+    client.request(
+        'update_interests', 'PATCH', '/api/users/update_interests/', user,
+        {'interests': rng.sample(fixture.interests, min(3, len(fixture.interests)))}
+    )
+    status, questions = client.request(
+        'onboarding_questions', 'GET', f'/api/onboarding-questions/?seed={rng.randrange(1000)}', user
+    )
+    if status == 200 and questions:
+        client.request(
+            'onboarding_answers', 'POST', '/api/onboarding-answers/bulk/', user,
+            {'answers': [{'question': question['id'], 'answer': answer_for(question, rng)} for question in questions]}
+        )
+    status, tracks = client.request('recommendations', 'GET', '/api/users/recommendations/', user)
+    if status == 200 and tracks:
+        client.request(
+            'select_career_paths', 'POST', '/api/users/select_career_paths/', user,
+            {'career_track_ids': [track['id'] for track in tracks[:4]]}
+        )
+
+
+def save_answers_flow(client, fixture, rng):
+    # Resubmits a user's onboarding answers, upserting rows and the profile
+    client.request(
+        'save_answers', 'POST', '/api/onboarding-answers/bulk/', rng.choice(fixture.users),
+        {'answers': [
+            {'question': question['pk'], 'answer': answer_for(question, rng)}
+            for question in rng.sample(fixture.onboarding_questions, min(5, len(fixture.onboarding_questions)))
+        ]}
+    )
+
+
+def register_flow(client, fixture, rng):
+    # A new user signing up; removed with the seeded users
+    username = f'{USER_PREFIX}-signup-{rng.getrandbits(48):012x}'
+    client.request(
+        'register', 'POST', '/api/users/register/', None,
+        {'username': username, 'email': f'{username}@example.com', 'password': PASSWORD, 'confirm_password': PASSWORD}
+    )
+
+
+FLOWS = {
+    'recommendations': recommendations_flow,
+    'learning_page': learning_page_flow,
+    'submit_answer': submit_answer_flow,
+    'onboarding': onboarding_flow,
+    'save_answers': save_answers_flow,
+    'register': register_flow,
+}
+
+
+def parse_mix(value):
+    # "recommendations=4,onboarding=1" -> {'recommendations': 4, 'onboarding': 1},
+    # or the name of one of MIXES
+    if value in MIXES:
+        return dict(MIXES[value])
+    mix = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in FLOWS:
+            raise ValueError(f'Unknown flow "{name}"; expected one of {", ".join(FLOWS)}')
+        mix[name] = int(weight or 1)
+        if mix[name] < 0:
+            raise ValueError(f'Negative weight for "{name}"')
+    if not any(mix.values()):
+        raise ValueError('Every flow has weight 0')
+    return mix
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class LoadTestServer(ThreadedWSGIServer):
+    # Room for every client's connection while the workers are busy
+    request_queue_size = 256
+
+
+@contextmanager
+def local_server(host='127.0.0.1'):
+    # A threaded WSGI server for this project on a free port; yields its URL
+    server = LoadTestServer((host, 0), QuietHandler, allow_reuse_address=False)
+    server.set_app(get_wsgi_application())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        with override_settings(INSTRUMENTATION_SERVER_TIMING=True):
+            yield f'http://{host}:{server.server_port}'
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+def drive(base_url, fixture, mix, concurrency, duration, seed=0, auth='token'):
+    # Runs flows picked by weight from `concurrency` threads for `duration`
+    # seconds; returns the recorder and the elapsed wall time
+    recorder = Recorder()
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    deadline = time.perf_counter() + duration
+
+    def client_loop(number):
+        rng = random.Random(f'{seed}:{number}')
+        client = Client(base_url, recorder, auth)
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            start = time.perf_counter()
+            FLOWS[name](client, fixture, rng)
+            recorder.flow(name, time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client_loop, args=(number,)) for number in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder, time.perf_counter() - start
+
+
+def distribution(values, digits=2):
+    # Mean, nearest-rank percentiles and max of a list of numbers
+    values = sorted(value for value in values if value is not None)
+    if not values:
+        return None
+    count = len(values)
+
+    def percentile(fraction):
+        return round(values[min(count - 1, int(fraction * count))], digits)
+
+    return {
+        'mean': round(sum(values) / count, digits),
+        'p50': percentile(0.50),
+        'p95': percentile(0.95),
+        'p99': percentile(0.99),
+        'max': round(values[-1], digits),
+    }
+
+
+def summarize_requests(samples, elapsed):
+    statuses = {}
+    for _, status, _, _ in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for _, status, _, _ in samples if status is None or status >= 500),
+        'statuses': dict(sorted(statuses.items())),
+        'throughput_rps': round(len(samples) / elapsed, 2) if elapsed else None,
+        'latency_ms': distribution(seconds * 1000 for seconds, _, _, _ in samples),
+        'queries': distribution((queries for _, _, queries, _ in samples), 1),
+        'db_ms': distribution(db_ms for _, _, _, db_ms in samples),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def report(recorder, elapsed, config, cpu_seconds=None):
+    samples = [sample for endpoint in recorder.requests.values() for sample in endpoint]
+    total = summarize_requests(samples, elapsed)
+    if cpu_seconds is not None and samples:
+        # Server and clients together; only in-process runs can measure it
+        total['cpu_ms_per_request'] = round(cpu_seconds / len(samples) * 1000, 3)
+    return {
+        'started_at': config.pop('started_at'),
+        'commit': git_revision(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'database_profile': getattr(settings, 'DATABASE_PROFILE', None),
+        'config': config,
+        'elapsed_seconds': round(elapsed, 3),
+        'total': total,
+        'endpoints': {
+            endpoint: summarize_requests(samples, elapsed)
+            for endpoint, samples in sorted(recorder.requests.items())
+        },
+        'flows': {
+            name: {
+                'count': len(timings),
+                'throughput_per_sec': round(len(timings) / elapsed, 2) if elapsed else None,
+                'latency_ms': distribution(seconds * 1000 for seconds in timings),
+            }
+            for name, timings in sorted(recorder.flows.items())
+        },
+    }
+
+
+def run(url=None, users=100, tracks=100, pages=5, answers=5, concurrency=8, duration=10.0, warmup=2.0,
+        mix=None, seed=0, seed_data=True, auth='token', stdout=None):
+    # The whole load test; returns the report
+    mix = mix or dict(DEFAULT_MIX)
+    config = {
+        'started_at': timezone.now().isoformat(), 'url': url, 'users': users, 'tracks': tracks, 'pages': pages,
+        'answers': answers, 'concurrency': concurrency, 'duration': duration, 'warmup': warmup, 'mix': mix,
+        'seed': seed, 'auth': auth,
+    }
+    if seed_data:
+        populate(users, tracks, pages, answers, seed=seed, stdout=stdout)
+    fixture = Fixture(users)
+
+    with (local_server() if url is None else nullcontext(url)) as base_url:
+        # Warm-up traffic fills the per-process caches and isn't reported
+        if warmup:
+            drive(base_url, fixture, mix, concurrency, warmup, seed=f'warmup:{seed}', auth=auth)
+        cpu_start = time.process_time()
+        recorder, elapsed = drive(base_url, fixture, mix, concurrency, duration, seed=seed, auth=auth)
+        cpu_seconds = time.process_time() - cpu_start if url is None else None
+    return report(recorder, elapsed, config, cpu_seconds)
+
@@ -1,80 +1,39 @@
 from django.core.management.base import BaseCommand
-from api.models import CareerTrack, LearningPage, PhaseTwoFunFact, PhaseTwoDayInLife, PhaseTwoScenario, PhaseTwoReflection
+from api.loader import BulkLoader
+from api.models import CareerTrack, LearningPage, PhaseTwoFunFact
 
 class Command(BaseCommand):
     help = 'Adds Phase 2 content to existing career tracks'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
     def handle(self, *args, **kwargs):
-        career_tracks = CareerTrack.objects.all()
+        loader = BulkLoader(kwargs['batch_size'])
         added_count = 0
 
-        for track in career_tracks:
-            try:
-                # Get the first learning page for the career track
-                learning_page = track.learning_pages.first()
-                if not learning_page:
-                    self.stdout.write(f'Skipping {track.title}: No learning pages found.')
-                    continue
-
-                # Check if Phase 2 content already exists for this learning page
-                if not PhaseTwoFunFact.objects.filter(learning_page=learning_page).exists():
-                    self.stdout.write(f'Adding Phase 2 content to {track.title} (Learning Page {learning_page.page_number})...')
-
-                # Fun Facts
-                PhaseTwoFunFact.objects.create(
-                    learning_page=learning_page,
-                    title='Did You Know?',
-                    fact_text='Coming soon...',
-                    takeaway='Coming soon...'
-                )
-                PhaseTwoFunFact.objects.create(
-                    learning_page=learning_page,
-                    title='Interesting Fact',
-                    fact_text='Coming soon...',
-                    takeaway='Coming soon...'
-                )
-
-                # Day in Life
-                PhaseTwoDayInLife.objects.create(
-                    learning_page=learning_page,
-                    narrative={
-                        'morning': 'Coming soon...',
-                        'afternoon': 'Coming soon...',
-                        'evening': 'Coming soon...'
-                    }
-                )
-
-                # Scenarios
-                PhaseTwoScenario.objects.create(
-                    learning_page=learning_page,
-                    question='Coming soon...',
-                    option_a='Coming soon...',
-                    option_b='Coming soon...',
-                    option_c='Coming soon...',
-                    correct_option='A',
-                    explanation='Coming soon...'
-                )
-                PhaseTwoScenario.objects.create(
-                    learning_page=learning_page,
-                    question='Coming soon...',
-                    option_a='Coming soon...',
-                    option_b='Coming soon...',
-                    option_c='Coming soon...',
-                    correct_option='A',
-                    explanation='Coming soon...'
-                )
-
-                # Reflection
-                PhaseTwoReflection.objects.create(
-                    learning_page=learning_page,
-                    question_text='Coming soon...',
-                    option_1='Coming soon...',
-                    option_2='Coming soon...',
-                    option_3='Coming soon...'
-                )
-
-                added_count += 1
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(f'Error adding Phase 2 content to {track.title}: {e}'))
-
-        self.stdout.write(self.style.SUCCESS(f'Successfully added Phase 2 content to {added_count} career tracks')) 
\ No newline at end of file
+        # The first learning page of every track, in one query
+        first_pages = {}
+        for page in LearningPage.objects.order_by('career_track_id', 'page_number', 'pk').only('pk', 'career_track_id', 'page_number'):
+            first_pages.setdefault(page.career_track_id, page)
+        for title in CareerTrack.objects.exclude(pk__in=list(first_pages)).values_list('title', flat=True):
+            self.stdout.write(f'Skipping {title}: No learning pages found.')
+
+        # Pages that already have Phase 2 content are left alone
+        done = set(
+            PhaseTwoFunFact.objects.filter(learning_page__in=[page.pk for page in first_pages.values()])
+            .values_list('learning_page_id', flat=True)
+        )
+        pages = [page for page in first_pages.values() if page.pk not in done]
+
+        def add(batch):
+            nonlocal added_count
+            loader.add_phase_two(batch)
+            added_count += len(batch)
+
+        loader.run([page.pk for page in pages], add)
+        loader.invalidate_caches()
+
+        for line in loader.report():
+            self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS(f'Successfully added Phase 2 content to {added_count} career tracks'))
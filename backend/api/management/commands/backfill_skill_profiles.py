@@ -0,0 +1,35 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from api import authentication, skills
+
+CustomUser = get_user_model()
+
+class Command(BaseCommand):
+    help = 'Recomputes every user\'s skill profile from their onboarding answers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        updated = 0
+        last_id = 0
+
+        while True:
+            user_ids = list(
+                CustomUser.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not user_ids:
+                break
+            profiles = skills.build_profiles(user_ids)
+            CustomUser.objects.bulk_update(
+                [CustomUser(pk=user_id, skill_profile=profile) for user_id, profile in profiles.items()],
+                ['skill_profile']
+            )
+            updated += len(user_ids)
+            last_id = user_ids[-1]
+            self.stdout.write(f'Updated {updated} users...')
+
+        # bulk_update skips post_save; cached copies of every user are stale
+        authentication.invalidate_all()
+        self.stdout.write(self.style.SUCCESS(f'Successfully backfilled skill profiles for {updated} users'))
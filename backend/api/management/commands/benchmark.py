@@ -0,0 +1,18 @@
+import json
+import random
+from django.core.management.base import BaseCommand
+from api.benchmarks import SCENARIOS
+
+class Command(BaseCommand):
+    help = 'Runs a benchmark scenario from api/benchmarks.py and prints the results as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenario', choices=sorted(SCENARIOS))
+        parser.add_argument('--scale', type=int, help='Amount of synthetic data (scenario default if omitted)')
+        parser.add_argument('--repeat', type=int, default=1000, help='Operations to time per measurement')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        results = SCENARIOS[options['scenario']](options['scale'], options['repeat'])
+        self.stdout.write(json.dumps({'scenario': options['scenario'], **results}, indent=2))
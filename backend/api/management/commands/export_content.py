@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from api.content import export_records, write_records
+from api.loader import open_stream
+
+class Command(BaseCommand):
+    help = 'Streams the learning catalogue (interests, tracks, pages and their content) as NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-', help='Output file, gzipped if it ends in .gz (default: stdout)')
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        records = export_records(options['chunk_size'])
+        if options['path'] == '-':
+            write_records(self.stdout, records)
+            return
+        with open_stream(options['path'], 'w') as stream:
+            count = write_records(stream, records)
+        self.stderr.write(f'Exported {count} records to {options["path"]}')
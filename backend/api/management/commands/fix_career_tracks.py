@@ -1,40 +1,28 @@
 from django.core.management.base import BaseCommand
-from api.models import CareerTrack, LearningPage, PageSection
+from api.loader import BulkLoader
+from api.models import CareerTrack
 
 class Command(BaseCommand):
     help = 'Fixes career tracks that don\'t have learning pages'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
     def handle(self, *args, **kwargs):
-        career_tracks = CareerTrack.objects.all()
+        loader = BulkLoader(kwargs['batch_size'])
         fixed_count = 0
 
-        for track in career_tracks:
-            # Check if the track has any learning pages
-            if not track.learning_pages.exists():
-                self.stdout.write(f'Creating learning page for {track.title}...')
-                
-                # Create Page 1
-                learning_page = LearningPage.objects.create(
-                    career_track=track,
-                    page_number=1
-                )
-
-                # Create default sections
-                sections = [
-                    ('overview', 'Overview'),
-                    ('scope', 'Scope and Impact'),
-                    ('opportunities', 'Opportunities'),
-                    ('skills', 'Skills Required'),
-                    ('knowledge', 'Knowledge Areas')
-                ]
+        def fix(tracks):
+            nonlocal fixed_count
+            for track_id, title in tracks:
+                self.stdout.write(f'Creating learning page for {title}...')
+            loader.create_pages({track_id: 1 for track_id, _ in tracks})
+            fixed_count += len(tracks)
 
-                for order, (section_type, _) in enumerate(sections):
-                    PageSection.objects.create(
-                        learning_page=learning_page,
-                        section_type=section_type,
-                        content='Coming soon...',
-                        order=order
-                    )
-                fixed_count += 1
+        tracks = CareerTrack.objects.filter(learning_pages__isnull=True).order_by('pk').values_list('pk', 'title')
+        loader.run(list(tracks), fix)
+        loader.invalidate_caches()
 
-        self.stdout.write(self.style.SUCCESS(f'Successfully fixed {fixed_count} career tracks')) 
\ No newline at end of file
+        for line in loader.report():
+            self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS(f'Successfully fixed {fixed_count} career tracks'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from api import xp_buffer
+
+class Command(BaseCommand):
+    help = 'Replays XP journals left behind by workers that stopped before flushing'
+
+    def handle(self, *args, **options):
+        journals = list(xp_buffer.orphaned_journals())
+        if not journals:
+            self.stdout.write('No unflushed XP journals found.')
+            return
+
+        for path in journals:
+            self.stdout.write(f'Replaying {path.name}...')
+        events = xp_buffer.replay(journals)
+        self.stdout.write(self.style.SUCCESS(f'Replayed {events} XP events from {len(journals)} journals'))
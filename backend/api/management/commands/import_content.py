@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+from api.content import ContentImporter
+from api.loader import BulkLoader, read_records
+
+class Command(BaseCommand):
+    help = 'Imports an export_content NDJSON file, upserting on track slug and page number'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='NDJSON file from export_content, optionally gzipped (.gz)')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        loader = BulkLoader(options['batch_size'])
+        importer = ContentImporter(loader)
+        try:
+            loader.run(read_records(options['path']), importer.load)
+        except (KeyError, TypeError, ValueError) as e:
+            raise CommandError(f'Invalid record in {options["path"]}: {e}')
+        except IntegrityError as e:
+            # e.g. a track whose title is taken by a track with another slug
+            raise CommandError(f'Record in {options["path"]} conflicts with existing content: {e}')
+        finally:
+            loader.invalidate_caches()
+
+        for line in loader.report():
+            self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS('Successfully imported content'))
@@ -0,0 +1,58 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from api import loadtest
+
+class Command(BaseCommand):
+    help = 'Seeds synthetic data, drives the API with concurrent clients and prints latency, throughput and query counts as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            help='Base URL of a running server using this database, started with INSTRUMENTATION_SERVER_TIMING=1 '
+                 'for query counts (default: an in-process server)'
+        )
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--tracks', type=int, default=100)
+        parser.add_argument('--pages', type=int, default=5, help='Learning pages per track')
+        parser.add_argument('--answers', type=int, default=5, help='Onboarding answers per user')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds to measure for')
+        parser.add_argument('--warmup', type=float, default=2.0, help='Seconds of unreported traffic first')
+        parser.add_argument(
+            '--mix', default='default',
+            help=f'Flow weights as flow=weight,... with flows from {", ".join(loadtest.FLOWS)}; '
+                 f'or one of the mixes {", ".join(loadtest.MIXES)}'
+        )
+        parser.add_argument('--auth', choices=['token', 'basic'], default='token', help='How clients sign in')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--no-seed', action='store_true', help='Reuse the data a previous run seeded')
+        parser.add_argument('--cleanup', action='store_true', help='Delete the seeded data afterwards')
+        parser.add_argument('--output', help='Write the report to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        try:
+            mix = loadtest.parse_mix(options['mix'])
+        except ValueError as e:
+            raise CommandError(e)
+
+        # Seeding progress goes to stderr so stdout is just the report
+        try:
+            results = loadtest.run(
+                url=options['url'], users=options['users'], tracks=options['tracks'], pages=options['pages'],
+                answers=options['answers'], concurrency=options['concurrency'], duration=options['duration'],
+                warmup=options['warmup'], mix=mix, seed=options['seed'], seed_data=not options['no_seed'],
+                auth=options['auth'], stdout=self.stderr,
+            )
+        except ValueError as e:
+            raise CommandError(e)
+        finally:
+            if options['cleanup']:
+                loadtest.remove_seeded()
+
+        body = json.dumps(results, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                output.write(body + '\n')
+            self.stderr.write(f'Report written to {options["output"]}')
+        else:
+            self.stdout.write(body)
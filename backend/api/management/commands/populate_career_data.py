@@ -1,6 +1,5 @@
 from django.core.management.base import BaseCommand
-from api.models import Interest, CareerTrack
-from django.utils.text import slugify
+from api.loader import BulkLoader, read_records
 
 INTERESTS_LIST = [
     "Tech", "Coding", "Data", "Design", "Figma", "Cybersecurity", "Hacking",
@@ -99,33 +98,26 @@ CAREER_TRACK_DETAILS = {
 class Command(BaseCommand):
     help = 'Populates the database with initial interests and career tracks.'
 
-    def handle(self, *args, **options):
-        self.stdout.write('Populating interests...')
-        interests_obj = {}
-        for interest_name in INTERESTS_LIST:
-            interest, created = Interest.objects.get_or_create(name=interest_name)
-            interests_obj[interest_name] = interest
-            if created:
-                self.stdout.write(f'Created interest: {interest_name}')
+    def add_arguments(self, parser):
+        parser.add_argument('--from-file', help='JSON array or NDJSON of track records to load instead of the built-in tracks')
+        parser.add_argument('--batch-size', type=int, default=1000)
 
-        self.stdout.write('\nPopulating career tracks and mapping interests...')
-        for career_track_title, relevant_interest_names in CAREER_PATHS_MAPPING.items():
-            details = CAREER_TRACK_DETAILS.get(career_track_title, {})
-            career_track, created = CareerTrack.objects.get_or_create(
-                title=career_track_title,
-                defaults={
-                    'emoji': details.get('emoji'),
-                    'description': details.get('description'),
-                    'avg_salary': details.get('avg_salary'),
-                }
+    def handle(self, *args, **options):
+        loader = BulkLoader(options['batch_size'])
+        if options['from_file']:
+            self.stdout.write(f'Loading career tracks from {options["from_file"]}...')
+            records = read_records(options['from_file'])
+        else:
+            self.stdout.write('Populating interests and career tracks...')
+            loader.load_interests(INTERESTS_LIST)
+            records = (
+                {'title': title, 'interests': interests, **CAREER_TRACK_DETAILS.get(title, {})}
+                for title, interests in CAREER_PATHS_MAPPING.items()
             )
 
-            if created:
-                self.stdout.write(f'Created career track: {career_track_title}')
-
-            # Add relevant interests
-            track_interests = [interests_obj[name] for name in relevant_interest_names if name in interests_obj]
-            career_track.relevant_interests.set(track_interests)
-            self.stdout.write(f'Mapped {len(track_interests)} interests to {career_track_title}')
+        loader.run(records, loader.load_tracks)
+        loader.invalidate_caches()
 
-        self.stdout.write('\nDatabase population complete.') 
\ No newline at end of file
+        for line in loader.report():
+            self.stdout.write(line)
+        self.stdout.write('\nDatabase population complete.')
@@ -1,5 +1,5 @@
 from django.core.management.base import BaseCommand
-from api.models import OnboardingQuestion
+from api.loader import BulkLoader, read_records
 
 QUESTIONS = [
     {
@@ -118,22 +118,19 @@ QUESTIONS = [
 class Command(BaseCommand):
     help = 'Populates the database with predefined questions'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--from-file', help='JSON array or NDJSON of question records to load instead of the built-in questions')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
     def handle(self, *args, **options):
         self.stdout.write('Populating questions...')
-        
-        for question_data in QUESTIONS:
-            question, created = OnboardingQuestion.objects.get_or_create(
-                text=question_data['text'],
-                defaults={
-                    'type': question_data['type'],
-                    'options': question_data.get('options'),
-                    'tags': question_data['tags']
-                }
-            )
-            
-            if created:
-                self.stdout.write(f'Created question: {question.text}')
-            else:
-                self.stdout.write(f'Question already exists: {question.text}')
-        
-        self.stdout.write(self.style.SUCCESS('Successfully populated questions')) 
\ No newline at end of file
+        loader = BulkLoader(options['batch_size'])
+        records = read_records(options['from_file']) if options['from_file'] else QUESTIONS
+
+        # Questions that already exist (by text) are left as they are
+        loader.run(records, loader.load_questions)
+        loader.invalidate_caches()
+
+        for line in loader.report():
+            self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS('Successfully populated questions'))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from rest_framework.authtoken.models import Token
+from api import authentication
+
+class Command(BaseCommand):
+    help = 'Deletes auth tokens older than AUTH_TOKEN_LIFETIME, a chunk at a time'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        cutoff = authentication.expiry_cutoff()
+        if cutoff is None:
+            self.stdout.write('Tokens never expire (AUTH_TOKEN_LIFETIME is None); nothing to purge')
+            return
+
+        # Each chunk is its own short DELETE, so logins aren't held up behind
+        # one long-running transaction. Chunks walk the primary key (created
+        # isn't indexed), so the table is read once however many chunks
+        purged = 0
+        last_key = ''
+        while True:
+            keys = list(
+                Token.objects.filter(pk__gt=last_key, created__lte=cutoff)
+                .order_by('pk').values_list('pk', flat=True)[:options['batch_size']]
+            )
+            if not keys:
+                break
+            purged += Token.objects.filter(pk__in=keys, created__lte=cutoff).delete()[0]
+            last_key = keys[-1]
+            self.stdout.write(f'Purged {purged} tokens...')
+
+        self.stdout.write(self.style.SUCCESS(f'Successfully purged {purged} expired tokens'))
@@ -0,0 +1,25 @@
+import time
+from django.core.management.base import BaseCommand
+from api import leaderboard
+from api.models import Progress
+
+class Command(BaseCommand):
+    help = (
+        'Rebuilds the leaderboards. With a shared cache (CACHE_BACKEND=redis or memcached) running workers reload '
+        'theirs on next read; with the default per-process cache they only pick up changes on their next '
+        'scheduled refresh (LEADERBOARD_REFRESH_INTERVAL)'
+    )
+
+    def handle(self, *args, **options):
+        leaderboard.rebuild()
+
+        start = time.perf_counter()
+        board = leaderboard.get_board()
+        self.stdout.write(f'Global leaderboard: {len(board)} users ({time.perf_counter() - start:.2f}s)')
+
+        for career_id in Progress.objects.values_list('career_id', flat=True).distinct():
+            start = time.perf_counter()
+            board = leaderboard.get_board(career_id)
+            self.stdout.write(f'Career {career_id} leaderboard: {len(board)} users ({time.perf_counter() - start:.2f}s)')
+
+        self.stdout.write(self.style.SUCCESS('Leaderboards rebuilt'))
@@ -0,0 +1,38 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from api import warmup
+
+class Command(BaseCommand):
+    help = (
+        'Runs the worker warm-up stages and prints their timings as JSON; with --profile, starts cold '
+        'workers with and without warm-up and reports import times, stage times and first-request latency'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', action='store_true', help='Profile cold workers instead')
+        parser.add_argument('--check', action='store_true', help='Profile, and fail when a warmed worker is over budget')
+        parser.add_argument('--budget', type=float, help='First-request budget in ms (default: API_WARMUP_BUDGET_MS)')
+        parser.add_argument('--path', action='append', dest='paths', help='Path to request first (repeatable)')
+        parser.add_argument('--top', type=int, default=20, help='Packages and modules to list by import time')
+
+    def handle(self, *args, **options):
+        if not (options['profile'] or options['check']):
+            timings = warmup.run(warmup.STAGES + warmup.DATABASE_STAGES)
+            self.stdout.write(json.dumps({'stages': timings, 'total_ms': round(sum(timings.values()), 3)}, indent=2))
+            return
+
+        paths = options['paths'] or warmup.hot_paths()
+        budget = options['budget'] if options['budget'] is not None else warmup.budget_ms()
+        try:
+            results = {
+                'budget_ms': budget,
+                'cold': warmup.profile(paths, warm=False, top=options['top']),
+                'warm': warmup.profile(paths, warm=True, top=options['top']),
+            }
+        except RuntimeError as e:
+            raise CommandError(e)
+        self.stdout.write(json.dumps(results, indent=2))
+
+        slowest = results['warm']['slowest_request_ms']
+        if options['check'] and slowest is not None and slowest > budget:
+            raise CommandError(f'Slowest first request of a warmed worker took {slowest}ms, over the {budget}ms budget')
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 05:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_remove_phasetwodayinlife_career_path_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='skill_profile',
+            field=models.JSONField(default=dict),
+        ),
+    ]
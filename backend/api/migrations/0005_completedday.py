@@ -0,0 +1,41 @@
+# Generated by Django 5.2.1 on 2026-10-18 07:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_completed_days(apps, schema_editor):
+    # days_completed used to hold the furthest day reached; days are taken
+    # in order, so that is days 1..n
+    Progress = apps.get_model('api', 'Progress')
+    CompletedDay = apps.get_model('api', 'CompletedDay')
+    CompletedDay.objects.bulk_create(
+        (
+            CompletedDay(progress_id=progress_id, day=day)
+            for progress_id, days_completed in Progress.objects.filter(days_completed__gt=0).values_list('pk', 'days_completed')
+            for day in range(1, days_completed + 1)
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_customuser_skill_profile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompletedDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.PositiveIntegerField()),
+                ('progress', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='completed_days', to='api.progress')),
+            ],
+            options={
+                'unique_together': {('progress', 'day')},
+            },
+        ),
+        migrations.RunPython(backfill_completed_days, migrations.RunPython.noop),
+    ]
@@ -9,6 +9,7 @@ class CustomUser(AbstractUser):
     streak = models.IntegerField(default=0)
     onboarding_complete = models.BooleanField(default=False)
     selected_career_paths = models.JSONField(default=list)
+    skill_profile = models.JSONField(default=dict)  # Skill tag -> weight, derived from onboarding answers
     
     # Add related_name to fix reverse accessor clashes
     groups = models.ManyToManyField(
@@ -86,6 +87,22 @@ class Progress(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.career.title} Progress"
 
+class CompletedDay(models.Model):
+    # A day of the career whose quiz the user finished; days_completed counts them
+    progress = models.ForeignKey(Progress, on_delete=models.CASCADE, related_name='completed_days')
+    day = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ('progress', 'day')
+
+    @classmethod
+    def record(cls, progress_id, days):
+        # How many of the days the Progress row hadn't completed before
+        return sum(cls.objects.get_or_create(progress_id=progress_id, day=day)[1] for day in days)
+
+    def __str__(self):
+        return f"{self.progress} - Day {self.day}"
+
 class OnboardingQuestion(models.Model):
     text = models.TextField()
     type = models.CharField(max_length=20)  # yes_no, multi_choice, scale_1_5
@@ -104,15 +121,32 @@ class UserAnswer(models.Model):
     class Meta:
         unique_together = ('user', 'question')  # One answer per question per user
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what was stored so the skill profile can be updated by delta
+        instance._stored = (instance.__dict__.get('question_id'), instance.__dict__.get('answer'))
+        return instance
+
     def __str__(self):
         return f"{self.user.email} - {self.question.text}"
 
+class LearningPageQuerySet(models.QuerySet):
+    def with_content(self):
+        # Load the whole page graph LearningPageSerializer renders in a fixed
+        # number of queries, however many pages are returned
+        return self.select_related('day_in_life').prefetch_related(
+            'sections', 'fun_facts', 'scenarios', 'reflections'
+        )
+
 class LearningPage(models.Model):
     career_track = models.ForeignKey(CareerTrack, on_delete=models.CASCADE, related_name='learning_pages')
     page_number = models.PositiveIntegerField(default=1)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = LearningPageQuerySet.as_manager()
+
     class Meta:
         ordering = ['page_number']
 
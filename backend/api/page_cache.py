@@ -0,0 +1,48 @@
+import hashlib
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from . import generations
+from .renderers import FastJSONRenderer
+
+# Rendered LearningPageSerializer payloads, keyed by (track slug, page number).
+# Every key is namespaced by a generation that content signals replace, so an
+# edit anywhere in the catalogue retires all cached pages at once, including
+# pages whose slug or page number just changed (see api/generations.py).
+
+generation = generations.Generation('learning_page:generation')
+
+
+def _timeout():
+    return generations.max_age(getattr(settings, 'LEARNING_PAGE_CACHE_TIMEOUT', 60 * 60 * 24))
+
+
+def _key(slug, page_number):
+    return f'learning_page:{generation.get()}:{slug}:{page_number}'
+
+
+def get(slug, page_number):
+    # Returns (etag, body) or None
+    return cache.get(_key(slug, page_number))
+
+
+def store(slug, page_number, data):
+    body = FastJSONRenderer().render(data)
+    entry = ('"%s"' % hashlib.sha256(body).hexdigest(), body)
+    cache.set(_key(slug, page_number), entry, _timeout())
+    return entry
+
+
+def respond(request, entry):
+    etag, body = entry
+    response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    # Let clients keep the body but revalidate, so edits show up immediately
+    response['Cache-Control'] = 'no-cache'
+    # Swaps in a bodiless 304 when If-None-Match carries our ETag
+    return get_conditional_response(request, etag=etag, response=response)
+
+
+def invalidate():
+    generation.bump()
@@ -0,0 +1,69 @@
+from itertools import islice
+from django.http import StreamingHttpResponse
+from rest_framework.pagination import CursorPagination
+from .renderers import FastJSONRenderer
+
+# List endpoints return plain JSON arrays, which is what the frontend reads.
+# Two opt-in modes keep large lists cheap:
+#
+# - ?page_size=N or ?cursor=... switches to keyset pagination. Pages are
+#   cut on the primary key (WHERE pk > last seen, never OFFSET), so paging
+#   stays stable while rows are inserted and costs the same on page 1000 as
+#   on page 1. The response is {next, previous, results}.
+# - ?stream=1 streams the whole list as a JSON array, serializing the
+#   queryset chunk by chunk, so memory stays flat however many rows there are.
+
+
+class KeysetPagination(CursorPagination):
+    ordering = 'pk'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+
+class StreamingListMixin:
+    stream_query_param = 'stream'
+    stream_chunk_size = 1000
+
+    def wants_stream(self, request):
+        return request.query_params.get(self.stream_query_param) in ('1', 'true')
+
+    def wants_plain_list(self, request):
+        # Neither streamed nor paged: the whole list as one array
+        params = request.query_params
+        paginator = self.paginator
+        return not self.wants_stream(request) and not (
+            paginator is not None
+            and (paginator.cursor_query_param in params or paginator.page_size_query_param in params)
+        )
+
+    def list(self, request, *args, **kwargs):
+        if not self.wants_stream(request):
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        response = StreamingHttpResponse(self.stream(queryset), content_type='application/json')
+        response['Cache-Control'] = 'no-store'
+        return response
+
+    def stream(self, queryset):
+        # Each chunk is rendered as a list and spliced into one array, giving
+        # the same bytes as the unstreamed response
+        renderer = FastJSONRenderer()
+        rows = queryset.iterator(chunk_size=self.stream_chunk_size)
+        yield b'['
+        first = True
+        while True:
+            chunk = list(islice(rows, self.stream_chunk_size))
+            if not chunk:
+                break
+            body = renderer.render(self.get_serializer(chunk, many=True).data)[1:-1]
+            if body:
+                yield body if first else b',' + body
+                first = False
+        yield b']'
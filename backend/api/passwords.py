@@ -0,0 +1,72 @@
+import os
+import threading
+from django.conf import settings
+from django.contrib.auth import password_validation
+from django.contrib.auth.hashers import make_password
+from rest_framework.exceptions import APIException
+
+# Password validation and hashing for registration, with bounded concurrency.
+#
+# Hashing a password (PBKDF2) takes hundreds of milliseconds of CPU. Unbounded,
+# a burst of sign-ups runs as many hashes at once as the server has threads,
+# each slowed by all the others, and every other request on the worker waits
+# behind them for a core. Here the hash still runs on the request thread,
+# which is blocked for the whole of it, but at most PASSWORD_HASHING_WORKERS
+# registrations (default: one per CPU) hash at a time; the rest wait on a
+# semaphore without using a core, so sign-ups finish a few at a time instead
+# of all together at the end. At most PASSWORD_HASHING_QUEUE more can wait;
+# past that registration answers 503 with Retry-After rather than tying up
+# every server thread.
+#
+# warm(), run from ApiConfig.ready(), builds the validators once per process,
+# so CommonPasswordValidator decompresses its 20,000 passwords at startup
+# instead of during the first registration.
+
+_lock = threading.Lock()
+_running = None
+_slots = None
+
+
+class Busy(APIException):
+    status_code = 503
+    default_detail = 'Too many registrations at once, try again shortly.'
+    default_code = 'registration_busy'
+    # Sent as Retry-After by DRF's exception handler
+    wait = 1
+
+
+def workers():
+    return getattr(settings, 'PASSWORD_HASHING_WORKERS', None) or os.cpu_count() or 1
+
+
+def queue_size():
+    return getattr(settings, 'PASSWORD_HASHING_QUEUE', 64)
+
+
+def _limits():
+    # (registrations allowed to hash, registrations allowed in at all)
+    global _running, _slots
+    with _lock:
+        if _running is None:
+            _running = threading.BoundedSemaphore(workers())
+            _slots = threading.BoundedSemaphore(workers() + queue_size())
+        return _running, _slots
+
+
+def warm():
+    password_validation.get_default_password_validators()
+
+
+def hash_password(password, user=None):
+    # The hash of password once it passes AUTH_PASSWORD_VALIDATORS for user
+    # (an unsaved instance will do). Raises Django's ValidationError, or Busy
+    # when too many registrations are already waiting.
+    running, slots = _limits()
+    if not slots.acquire(blocking=False):
+        raise Busy()
+    try:
+        with running:
+            password_validation.validate_password(password, user)
+            return make_password(password)
+    finally:
+        slots.release()
@@ -0,0 +1,12 @@
+from .interest_index import get_index
+
+
+def rank_tracks(interest_names, limit=None):
+    # [(track_id, score)], best first. Every track is scored by how many of
+    # the given interests it shares, using the in-memory interest index.
+    # Tracks without any overlap are left out, ties are broken by id so the
+    # ranking is stable between requests.
+    if not interest_names:
+        return []
+    return get_index().rank(interest_names, limit=limit)
+
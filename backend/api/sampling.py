@@ -0,0 +1,85 @@
+import random
+import threading
+import time
+from . import generations
+from .models import OnboardingQuestion
+
+# Random onboarding questions without ORDER BY RANDOM(). Question ids are
+# loaded once per worker, grouped by type and by tag, and reloaded when a
+# question edit bumps the generation (api/generations.py). Drawing k
+# questions is then random.sample over in-memory id lists.
+
+generation = generations.Generation('onboarding_questions:generation')
+
+_lock = threading.Lock()
+_pool = None
+
+
+class QuestionPool:
+    def __init__(self, generation, rows):
+        self.generation = generation
+        self.built_at = time.monotonic()
+        self.ids = []
+        self.strata = {'type': {}, 'tag': {}}
+        for question_id, question_type, tags in rows:
+            self.ids.append(question_id)
+            self.strata['type'].setdefault(question_type, []).append(question_id)
+            for tag in tags or []:
+                self.strata['tag'].setdefault(tag, []).append(question_id)
+
+    def sample(self, k, rng, stratify=None):
+        if stratify is None:
+            return rng.sample(self.ids, min(k, len(self.ids)))
+
+        # Split k across the strata in proportion to their size (largest
+        # remainder first), then draw within each
+        strata = self.strata[stratify]
+        total = sum(len(ids) for ids in strata.values())
+        if not total:
+            return []
+        keys = sorted(strata)
+        shares = {key: k * len(strata[key]) / total for key in keys}
+        counts = {key: int(shares[key]) for key in keys}
+        remainders = sorted(keys, key=lambda key: (counts[key] - shares[key], rng.random()))
+        for key in remainders[:k - sum(counts.values())]:
+            counts[key] += 1
+
+        picked, seen = [], set()
+        for key in keys:
+            for question_id in rng.sample(strata[key], min(counts[key], len(strata[key]))):
+                if question_id not in seen:
+                    seen.add(question_id)
+                    picked.append(question_id)
+        # Tags overlap, so top up from the whole pool if duplicates cost us
+        if len(picked) < k:
+            rest = [question_id for question_id in self.ids if question_id not in seen]
+            picked.extend(rng.sample(rest, min(k - len(picked), len(rest))))
+        rng.shuffle(picked)
+        return picked
+
+
+def _stale(pool, current):
+    return pool is None or pool.generation != current or generations.outlived(pool.built_at)
+
+
+def get_pool():
+    global _pool
+    current = generation.get()
+    pool = _pool
+    if _stale(pool, current):
+        with _lock:
+            if _stale(_pool, current):
+                rows = OnboardingQuestion.objects.order_by('id').values_list('id', 'type', 'tags')
+                _pool = QuestionPool(current, rows.iterator(chunk_size=10000))
+            pool = _pool
+    return pool
+
+
+def sample_questions(k, seed=None, stratify=None):
+    # Ids of k random questions. The same seed gives the same questions for
+    # as long as the question set is unchanged.
+    return get_pool().sample(k, random.Random(seed), stratify)
+
+
+def invalidate():
+    generation.bump()
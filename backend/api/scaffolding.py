@@ -0,0 +1,103 @@
+import threading
+from contextlib import contextmanager
+from django.db import connection, transaction
+from .models import (
+    LearningPage, PageSection,
+    PhaseTwoFunFact, PhaseTwoDayInLife, PhaseTwoScenario, PhaseTwoReflection
+)
+
+# Default content for new learning pages. Templates map a model to the field
+# values of the rows every page gets; scaffold() inserts them for any number
+# of pages, for the signals and the admin as well as the bulk loader. New
+# tracks get a first page with the sections and the Phase 2 content, pages
+# added in the admin get the sections.
+#
+# Bulk imports that create their content themselves wrap their work in
+# suspended(), which turns off the CareerTrack post_save scaffolding for the
+# current thread.
+
+COMING_SOON = 'Coming soon...'
+
+SECTION_TEMPLATES = {
+    PageSection: [
+        {'section_type': section_type, 'content': COMING_SOON, 'order': order}
+        for order, (section_type, _) in enumerate(PageSection.SECTION_TYPES)
+    ],
+}
+
+PHASE_TWO_TEMPLATES = {
+    PhaseTwoFunFact: [
+        {'title': 'Did You Know?', 'fact_text': COMING_SOON, 'takeaway': COMING_SOON},
+        {'title': 'Interesting Fact', 'fact_text': COMING_SOON, 'takeaway': COMING_SOON},
+    ],
+    PhaseTwoDayInLife: [
+        {'narrative': {'morning': COMING_SOON, 'afternoon': COMING_SOON, 'evening': COMING_SOON}},
+    ],
+    PhaseTwoScenario: [
+        {
+            'question': COMING_SOON, 'option_a': COMING_SOON, 'option_b': COMING_SOON,
+            'option_c': COMING_SOON, 'correct_option': 'A', 'explanation': COMING_SOON,
+        },
+    ] * 2,
+    PhaseTwoReflection: [
+        {'question_text': COMING_SOON, 'option_1': COMING_SOON, 'option_2': COMING_SOON, 'option_3': COMING_SOON},
+    ],
+}
+
+FIRST_PAGE_TEMPLATES = {**SECTION_TEMPLATES, **PHASE_TWO_TEMPLATES}
+
+_state = threading.local()
+
+
+@contextmanager
+def suspended():
+    previous = getattr(_state, 'suspended', False)
+    _state.suspended = True
+    try:
+        yield
+    finally:
+        _state.suspended = previous
+
+
+def is_suspended():
+    return getattr(_state, 'suspended', False)
+
+
+def scaffold(page_ids, templates):
+    # One executemany per model for all the given pages. The rows only
+    # differ in their page, so each is prepared for the database once
+    # instead of a model being built and compiled per page; bulk imports
+    # create thousands of pages at a time.
+    with transaction.atomic(), connection.cursor() as cursor:
+        for model, rows in templates.items():
+            fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+            columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+            placeholders = ', '.join(['%s'] * len(fields))
+            page_column = [field.name for field in fields].index('learning_page')
+            sql = f'INSERT INTO {connection.ops.quote_name(model._meta.db_table)} ({columns}) VALUES ({placeholders})'
+            prepared = [
+                [
+                    None if field.name == 'learning_page'
+                    else field.get_db_prep_save(row.get(field.name, field.get_default()), connection)
+                    for field in fields
+                ]
+                for row in rows
+            ]
+            params = []
+            for page_id in page_ids:
+                for values in prepared:
+                    values[page_column] = page_id
+                    params.append(tuple(values))
+            cursor.executemany(sql, params)
+
+
+def scaffold_track(track):
+    # Page 1 of a new track with all its default content
+    with transaction.atomic():
+        page = LearningPage.objects.create(career_track=track, page_number=1)
+        scaffold([page.pk], FIRST_PAGE_TEMPLATES)
+    return page
+
+
+def scaffold_page(page):
+    scaffold([page.pk], SECTION_TEMPLATES)
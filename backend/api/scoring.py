@@ -0,0 +1,82 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from . import authentication, leaderboard, xp_buffer
+from .models import CompletedDay, Progress
+from .xp_buffer import Delta
+
+CustomUser = get_user_model()
+
+XP_PER_CORRECT_ANSWER = 10
+
+
+class InvalidAnswer(Exception):
+    pass
+
+
+def grade(question, answer):
+    # Question.options is a list of {text, is_correct}; the answer must be
+    # the text of one of them
+    for option in question.options or []:
+        if isinstance(option, dict) and option.get('text') == answer:
+            return bool(option.get('is_correct'))
+    raise InvalidAnswer('Answer must be one of the question options')
+
+
+def score(results, completed_day=None):
+    # Turns graded answers (a list of booleans in answer order) into a delta.
+    # Correct answers extend the streak; a wrong one resets it, leaving only
+    # the correct answers that came after it.
+    xp = XP_PER_CORRECT_ANSWER * sum(results)
+    days = () if completed_day is None else (completed_day,)
+    if all(results):
+        return Delta(xp, len(results), False, days)
+    trailing = 0
+    for correct in reversed(results):
+        if not correct:
+            break
+        trailing += 1
+    return Delta(xp, trailing, True, days)
+
+
+def apply_results(user, career_id, results, completed_day=None):
+    # Applies graded answers to the user's totals and their Progress row for
+    # the career, marking completed_day as done when given. Every write is an
+    # F-expression UPDATE touching only the scoring columns, inside one short
+    # transaction, so parallel submissions can't overwrite each other. In
+    # write-behind mode the delta is journaled and flushed later instead.
+    delta = score(results, completed_day)
+
+    if xp_buffer.enabled():
+        # The row itself is created now, so the progress endpoints list the
+        # career (with the pending XP overlaid) before the first flush
+        Progress.objects.get_or_create(user_id=user.pk, career_id=career_id)
+        xp_buffer.record(user.pk, career_id, delta)
+        xp, streak, days_completed, career_xp = xp_buffer.totals(user.pk, career_id)
+    else:
+        progress_update = {'xp': F('xp') + delta.xp, 'streak': delta.streak_expression(), 'last_attempt': timezone.now()}
+
+        with transaction.atomic():
+            # Write before reading so SQLite takes the write lock up front
+            CustomUser.objects.filter(pk=user.pk).update(xp=F('xp') + delta.xp, streak=delta.streak_expression())
+            progress, _ = Progress.objects.get_or_create(user_id=user.pk, career_id=career_id)
+            # Resubmitting a finished day doesn't count it twice
+            if CompletedDay.record(progress.pk, delta.completed_days):
+                progress_update['days_completed'] = F('days_completed') + 1
+            Progress.objects.filter(pk=progress.pk).update(**progress_update)
+            xp, streak = CustomUser.objects.filter(pk=user.pk).values_list('xp', 'streak').get()
+            days_completed, career_xp = Progress.objects.filter(pk=progress.pk).values_list('days_completed', 'xp').get()
+            # The UPDATE skips post_save, so cached copies of the user are retired here
+            authentication.invalidate_user(user.pk)
+
+    user.xp = xp
+    user.streak = streak
+    leaderboard.record(user.pk, xp)
+    leaderboard.record(user.pk, career_xp, career_id)
+    return {
+        'xp_gained': delta.xp,
+        'current_xp': xp,
+        'current_streak': streak,
+        'days_completed': days_completed,
+    }
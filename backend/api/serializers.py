@@ -1,5 +1,8 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from . import instrumentation, passwords, skills
 from .models import (
     Quiz, Question, Progress, Interest, CareerTrack, 
     OnboardingQuestion, UserAnswer, PageSection, LearningPage,
@@ -8,7 +11,13 @@ from .models import (
 
 CustomUser = get_user_model()
 
-class UserRegistrationSerializer(serializers.ModelSerializer):
+class ModelSerializer(serializers.ModelSerializer):
+    # Building .data counts as serialize time in Server-Timing
+    def to_representation(self, instance):
+        with instrumentation.serializing():
+            return super().to_representation(instance)
+
+class UserRegistrationSerializer(ModelSerializer):
     password = serializers.CharField(write_only=True)
     confirm_password = serializers.CharField(write_only=True)
 
@@ -19,53 +28,61 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
     def validate(self, data):
         if data['password'] != data['confirm_password']:
             raise serializers.ValidationError("Passwords do not match")
+        # Checked against AUTH_PASSWORD_VALIDATORS and hashed a few
+        # registrations at a time, see api/passwords.py
+        user = CustomUser(username=data['username'], email=data['email'])
+        try:
+            data['password_hash'] = passwords.hash_password(data['password'], user)
+        except DjangoValidationError as e:
+            raise serializers.ValidationError({'password': list(e.messages)})
         return data
 
     def create(self, validated_data):
-        validated_data.pop('confirm_password')
-        user = CustomUser.objects.create_user(
-            username=validated_data['username'],
-            email=validated_data['email'],
-            password=validated_data['password']
+        # create_user() without hashing the password again
+        user = CustomUser(
+            username=CustomUser.normalize_username(validated_data['username']),
+            email=CustomUser.objects.normalize_email(validated_data['email']),
+            password=validated_data['password_hash'],
         )
+        user.save()
         return user
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(ModelSerializer):
     class Meta:
         model = CustomUser
         fields = ['id', 'username', 'email', 'interests', 'selected_career_paths', 'onboarding_complete', 'xp']
 
-class InterestSerializer(serializers.ModelSerializer):
+class InterestSerializer(ModelSerializer):
     class Meta:
         model = Interest
         fields = '__all__'
 
-class PhaseTwoFunFactSerializer(serializers.ModelSerializer):
+class PhaseTwoFunFactSerializer(ModelSerializer):
     class Meta:
         model = PhaseTwoFunFact
         fields = ['id', 'title', 'fact_text', 'takeaway']
 
-class PhaseTwoDayInLifeSerializer(serializers.ModelSerializer):
+class PhaseTwoDayInLifeSerializer(ModelSerializer):
     class Meta:
         model = PhaseTwoDayInLife
         fields = ['id', 'narrative']
 
-class PhaseTwoScenarioSerializer(serializers.ModelSerializer):
+class PhaseTwoScenarioSerializer(ModelSerializer):
     class Meta:
         model = PhaseTwoScenario
         fields = ['id', 'question', 'option_a', 'option_b', 'option_c', 'correct_option', 'explanation']
 
-class PhaseTwoReflectionSerializer(serializers.ModelSerializer):
+class PhaseTwoReflectionSerializer(ModelSerializer):
     class Meta:
         model = PhaseTwoReflection
         fields = ['id', 'question_text', 'option_1', 'option_2', 'option_3']
 
-class PageSectionSerializer(serializers.ModelSerializer):
+class PageSectionSerializer(ModelSerializer):
     class Meta:
         model = PageSection
         fields = ['id', 'section_type', 'content', 'order']
 
-class LearningPageSerializer(serializers.ModelSerializer):
+class LearningPageSerializer(ModelSerializer):
     sections = PageSectionSerializer(many=True, read_only=True)
     fun_facts = PhaseTwoFunFactSerializer(many=True, read_only=True)
     day_in_life = PhaseTwoDayInLifeSerializer(read_only=True)
@@ -78,7 +95,7 @@ class LearningPageSerializer(serializers.ModelSerializer):
         model = LearningPage
         fields = ['id', 'page_number', 'sections', 'fun_facts', 'day_in_life', 'scenarios', 'reflections']
 
-class CareerTrackSerializer(serializers.ModelSerializer):
+class CareerTrackSerializer(ModelSerializer):
     relevant_interests = InterestSerializer(many=True, read_only=True)
     # Learning pages can be fetched separately via the learning_page_viewset
 
@@ -86,17 +103,17 @@ class CareerTrackSerializer(serializers.ModelSerializer):
         model = CareerTrack
         fields = ['id', 'slug', 'title', 'emoji', 'description', 'avg_salary', 'relevant_interests']
 
-class QuizSerializer(serializers.ModelSerializer):
+class QuizSerializer(ModelSerializer):
     class Meta:
         model = Quiz
         fields = '__all__'
 
-class QuestionSerializer(serializers.ModelSerializer):
+class QuestionSerializer(ModelSerializer):
     class Meta:
         model = Question
         fields = '__all__'
 
-class ProgressSerializer(serializers.ModelSerializer):
+class ProgressSerializer(ModelSerializer):
     career = CareerTrackSerializer(read_only=True)
     career_id = serializers.PrimaryKeyRelatedField(
         queryset=CareerTrack.objects.all(),
@@ -108,29 +125,92 @@ class ProgressSerializer(serializers.ModelSerializer):
         model = Progress
         fields = ['id', 'career', 'career_id', 'xp', 'streak', 'days_completed', 'completed', 'last_attempt']
 
-class OnboardingQuestionSerializer(serializers.ModelSerializer):
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Write-behind XP not flushed yet, from ProgressViewSet
+        delta = self.context.get('pending', {}).get(instance.career_id)
+        if delta is not None:
+            data['xp'] += delta.xp
+            data['streak'] = delta.overlay_streak(data['streak'])
+            if delta.completed_days:
+                # Prefetched by ProgressViewSet
+                stored_days = [completed.day for completed in instance.completed_days.all()]
+                data['days_completed'] = delta.overlay_days(data['days_completed'], stored_days)
+        return data
+
+class OnboardingQuestionSerializer(ModelSerializer):
     class Meta:
         model = OnboardingQuestion
         fields = '__all__'
 
-class UserAnswerSerializer(serializers.ModelSerializer):
+def validate_answer(question, answer):
+    # Validate answer based on question type
+    if question.type == 'yes_no':
+        if not isinstance(answer, bool):
+            raise serializers.ValidationError("Answer must be a boolean for yes/no questions")
+    elif question.type == 'multi_choice':
+        if not isinstance(answer, str) or answer not in (question.options or []):
+            raise serializers.ValidationError("Answer must be one of the provided options")
+    elif question.type == 'scale_1_5':
+        if not isinstance(answer, int) or answer < 1 or answer > 5:
+            raise serializers.ValidationError("Answer must be an integer between 1 and 5")
+
+class UserAnswerSerializer(ModelSerializer):
+    # Answers always belong to the requesting user
+    user = serializers.PrimaryKeyRelatedField(read_only=True, default=serializers.CurrentUserDefault())
+
     class Meta:
         model = UserAnswer
         fields = '__all__'
 
     def validate(self, data):
-        question = data['question']
-        answer = data['answer']
-
-        # Validate answer based on question type
-        if question.type == 'yes_no':
-            if not isinstance(answer, bool):
-                raise serializers.ValidationError("Answer must be a boolean for yes/no questions")
-        elif question.type == 'multi_choice':
-            if not isinstance(answer, str) or answer not in question.options:
-                raise serializers.ValidationError("Answer must be one of the provided options")
-        elif question.type == 'scale_1_5':
-            if not isinstance(answer, int) or answer < 1 or answer > 5:
-                raise serializers.ValidationError("Answer must be an integer between 1 and 5")
-
-        return data 
\ No newline at end of file
+        validate_answer(data['question'], data['answer'])
+        return data
+
+class BulkAnswerItemSerializer(serializers.Serializer):
+    question = serializers.IntegerField()
+    answer = serializers.JSONField()
+
+class BulkUserAnswerSerializer(serializers.Serializer):
+    # The whole onboarding questionnaire in one request
+    answers = BulkAnswerItemSerializer(many=True, allow_empty=False)
+
+    def validate_answers(self, answers):
+        question_ids = [item['question'] for item in answers]
+        if len(set(question_ids)) != len(question_ids):
+            raise serializers.ValidationError("Each question can only be answered once")
+
+        # One query for every referenced question, then validate in memory
+        questions = OnboardingQuestion.objects.in_bulk(question_ids)
+        errors = []
+        for item in answers:
+            question = questions.get(item['question'])
+            if question is None:
+                errors.append({'question': [f'Invalid pk "{item["question"]}" - object does not exist.']})
+                continue
+            try:
+                validate_answer(question, item['answer'])
+            except serializers.ValidationError as e:
+                errors.append({'answer': e.detail})
+                continue
+            item['question'] = question
+            errors.append({})
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return answers
+
+    def create(self, validated_data):
+        user = self.context['request'].user
+        answers = [
+            UserAnswer(user=user, question=item['question'], answer=item['answer'])
+            for item in validated_data['answers']
+        ]
+        with transaction.atomic():
+            # Upsert on (user, question); bulk_create skips the UserAnswer
+            # signals, so the skill profile is rebuilt here instead
+            UserAnswer.objects.bulk_create(
+                answers, update_conflicts=True,
+                unique_fields=['user', 'question'], update_fields=['answer']
+            )
+            skills.rebuild_profile(user)
+        return answers
@@ -1,83 +1,81 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
-from .models import CareerTrack, LearningPage, PageSection, PhaseTwoFunFact, PhaseTwoDayInLife, PhaseTwoScenario, PhaseTwoReflection
+from django.contrib.auth import get_user_model
+from rest_framework.authtoken.models import Token
+from . import authentication, interest_index, leaderboard, page_cache, sampling, scaffolding, skills
+from .models import Interest, CareerTrack, Progress, OnboardingQuestion, UserAnswer, LearningPage, PageSection, PhaseTwoFunFact, PhaseTwoDayInLife, PhaseTwoScenario, PhaseTwoReflection
 
 @receiver(post_save, sender=CareerTrack)
 def create_initial_content(sender, instance, created, **kwargs):
-    if created:
-        # Create Page 1
-        learning_page = LearningPage.objects.create(
-            career_track=instance,
-            page_number=1
-        )
+    # Bulk loaders suspend this and create the content for many tracks at once
+    if created and not scaffolding.is_suspended():
+        scaffolding.scaffold_track(instance)
 
-        # Create default sections
-        sections = [
-            ('overview', 'Overview'),
-            ('scope', 'Scope and Impact'),
-            ('opportunities', 'Opportunities'),
-            ('skills', 'Skills Required'),
-            ('knowledge', 'Knowledge Areas')
-        ]
+@receiver(post_save, sender=CareerTrack)
+@receiver(post_delete, sender=CareerTrack)
+@receiver(post_save, sender=Interest)
+@receiver(post_delete, sender=Interest)
+@receiver(m2m_changed, sender=CareerTrack.relevant_interests.through)
+def invalidate_interest_index(sender, **kwargs):
+    interest_index.invalidate()
+
+@receiver(post_save, sender=CareerTrack)
+@receiver(post_delete, sender=CareerTrack)
+@receiver(post_save, sender=LearningPage)
+@receiver(post_delete, sender=LearningPage)
+@receiver(post_save, sender=PageSection)
+@receiver(post_delete, sender=PageSection)
+@receiver(post_save, sender=PhaseTwoFunFact)
+@receiver(post_delete, sender=PhaseTwoFunFact)
+@receiver(post_save, sender=PhaseTwoDayInLife)
+@receiver(post_delete, sender=PhaseTwoDayInLife)
+@receiver(post_save, sender=PhaseTwoScenario)
+@receiver(post_delete, sender=PhaseTwoScenario)
+@receiver(post_save, sender=PhaseTwoReflection)
+@receiver(post_delete, sender=PhaseTwoReflection)
+def invalidate_page_cache(sender, **kwargs):
+    page_cache.invalidate()
+
+@receiver(post_save, sender=get_user_model())
+def update_global_leaderboard(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'xp' in update_fields:
+        leaderboard.record(instance.pk, instance.xp)
+
+@receiver(post_delete, sender=get_user_model())
+def remove_from_global_leaderboard(sender, instance, **kwargs):
+    leaderboard.remove(instance.pk)
+
+@receiver(post_save, sender=Progress)
+def update_track_leaderboard(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'xp' in update_fields:
+        leaderboard.record(instance.user_id, instance.xp, instance.career_id)
+
+@receiver(post_delete, sender=Progress)
+def remove_from_track_leaderboard(sender, instance, **kwargs):
+    leaderboard.remove(instance.user_id, instance.career_id)
 
-        for order, (section_type, _) in enumerate(sections):
-            PageSection.objects.create(
-                learning_page=learning_page,
-                section_type=section_type,
-                content='Coming soon...',
-                order=order
-            )
+@receiver(post_save, sender=OnboardingQuestion)
+@receiver(post_delete, sender=OnboardingQuestion)
+def invalidate_question_pool(sender, **kwargs):
+    sampling.invalidate()
 
-        # Create Phase 2 content
-        # Fun Facts
-        PhaseTwoFunFact.objects.create(
-            learning_page=learning_page,
-            title='Did You Know?',
-            fact_text='Coming soon...',
-            takeaway='Coming soon...'
-        )
-        PhaseTwoFunFact.objects.create(
-            learning_page=learning_page,
-            title='Interesting Fact',
-            fact_text='Coming soon...',
-            takeaway='Coming soon...'
-        )
+@receiver(post_save, sender=UserAnswer)
+def update_skill_profile(sender, instance, created, **kwargs):
+    skills.answer_saved(instance, created)
 
-        # Day in Life
-        PhaseTwoDayInLife.objects.create(
-            learning_page=learning_page,
-            narrative={
-                'morning': 'Coming soon...',
-                'afternoon': 'Coming soon...',
-                'evening': 'Coming soon...'
-            }
-        )
+@receiver(post_delete, sender=UserAnswer)
+def remove_from_skill_profile(sender, instance, **kwargs):
+    skills.answer_deleted(instance)
 
-        # Scenarios
-        PhaseTwoScenario.objects.create(
-            learning_page=learning_page,
-            question='Coming soon...',
-            option_a='Coming soon...',
-            option_b='Coming soon...',
-            option_c='Coming soon...',
-            correct_option='A',
-            explanation='Coming soon...'
-        )
-        PhaseTwoScenario.objects.create(
-            learning_page=learning_page,
-            question='Coming soon...',
-            option_a='Coming soon...',
-            option_b='Coming soon...',
-            option_c='Coming soon...',
-            correct_option='A',
-            explanation='Coming soon...'
-        )
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def invalidate_cached_tokens(sender, instance, **kwargs):
+    authentication.invalidate_user(instance.pk)
 
-        # Reflection
-        PhaseTwoReflection.objects.create(
-            learning_page=learning_page,
-            question_text='Coming soon...',
-            option_1='Coming soon...',
-            option_2='Coming soon...',
-            option_3='Coming soon...'
-        ) 
\ No newline at end of file
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    # Expired tokens are refused wherever they are cached, so purging them
+    # doesn't need to reach the other workers
+    authentication.forget(instance.key)
+    if not authentication.is_expired(instance.created):
+        authentication.invalidate_user(instance.user_id)
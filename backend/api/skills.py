@@ -0,0 +1,88 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from .models import OnboardingQuestion, UserAnswer
+
+# CustomUser.skill_profile maps skill tags to weights derived from the user's
+# onboarding answers. It is kept up to date by delta on every UserAnswer
+# change (see api/signals.py) and can be recomputed in bulk with the
+# backfill_skill_profiles command.
+
+CustomUser = get_user_model()
+
+
+def contributions(question_type, tags, answer):
+    # {tag: weight} a single answer adds to the profile
+    if question_type == 'yes_no':
+        weight = 1.0 if answer else 0.0
+    elif question_type == 'multi_choice':
+        weight = 1.0
+    elif question_type == 'scale_1_5' and isinstance(answer, int) and answer >= 4:
+        # Only high ratings count, 4 for half a point and 5 for a full one
+        weight = (answer - 3) / 2
+    else:
+        weight = 0.0
+    return {tag: weight for tag in tags or []} if weight else {}
+
+
+def merge(profile, weights, sign=1):
+    for tag, weight in weights.items():
+        total = round(profile.get(tag, 0.0) + sign * weight, 4)
+        if total > 0:
+            profile[tag] = total
+        else:
+            profile.pop(tag, None)
+    return profile
+
+
+def _answer_weights(question_id, answer, question=None):
+    if question_id is None:
+        return {}
+    if question is None or question.pk != question_id:
+        question = OnboardingQuestion.objects.filter(pk=question_id).only('type', 'tags').first()
+        if question is None:
+            return {}
+    return contributions(question.type, question.tags, answer)
+
+
+def update_profile(user_id, removed, added):
+    # Swaps one answer's weights for another's under a row lock
+    if not removed and not added:
+        return
+    with transaction.atomic():
+        user = CustomUser.objects.select_for_update().only('skill_profile').filter(pk=user_id).first()
+        if user is None:
+            return
+        merge(user.skill_profile, removed, sign=-1)
+        merge(user.skill_profile, added)
+        user.save(update_fields=['skill_profile'])
+
+
+def answer_saved(instance, created):
+    question_id, answer = (None, None) if created else getattr(instance, '_stored', (None, None))
+    question = instance.question if instance.question_id else None
+    removed = _answer_weights(question_id, answer, question)
+    added = _answer_weights(instance.question_id, instance.answer, question)
+    update_profile(instance.user_id, removed, added)
+    instance._stored = (instance.question_id, instance.answer)
+
+
+def answer_deleted(instance):
+    question_id, answer = getattr(instance, '_stored', (instance.question_id, instance.answer))
+    question = instance.question if UserAnswer.question.is_cached(instance) else None
+    update_profile(instance.user_id, _answer_weights(question_id, answer, question), {})
+
+
+def build_profiles(user_ids):
+    # Recomputes profiles from scratch in one query: {user_id: profile}
+    profiles = {user_id: {} for user_id in user_ids}
+    answers = UserAnswer.objects.filter(user_id__in=user_ids).values_list(
+        'user_id', 'question__type', 'question__tags', 'answer'
+    )
+    for user_id, question_type, tags, answer in answers:
+        merge(profiles[user_id], contributions(question_type, tags, answer))
+    return profiles
+
+
+def rebuild_profile(user):
+    user.skill_profile = build_profiles([user.pk])[user.pk]
+    user.save(update_fields=['skill_profile'])
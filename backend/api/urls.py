@@ -1,12 +1,13 @@
-from django.urls import path, include
+from django.urls import path, include, re_path
 from rest_framework.routers import DefaultRouter
 from .views import (
     UserViewSet, InterestViewSet, CareerTrackViewSet,
     QuizViewSet, QuestionViewSet,
-    ProgressViewSet, OnboardingQuestionViewSet, UserAnswerViewSet
+    ProgressViewSet, OnboardingQuestionViewSet, UserAnswerViewSet,
+    LeaderboardViewSet, MetricsViewSet, ObtainExpiringAuthToken
 )
-from rest_framework.authtoken.views import obtain_auth_token
 from django.views.decorators.csrf import csrf_exempt
+from . import async_views
 
 router = DefaultRouter()
 router.register(r'users', UserViewSet, basename='user')
@@ -17,11 +18,28 @@ router.register(r'questions', QuestionViewSet, basename='question')
 router.register(r'progress', ProgressViewSet, basename='progress')
 router.register(r'onboarding-questions', OnboardingQuestionViewSet, basename='onboarding-question')
 router.register(r'onboarding-answers', UserAnswerViewSet, basename='onboarding-answer')
+router.register(r'leaderboard', LeaderboardViewSet, basename='leaderboard')
+router.register(r'metrics', MetricsViewSet, basename='metrics')
 
 urlpatterns = [
     path('', include(router.urls)),
     path('auth/', include('rest_framework.urls')),
-    path('auth/token/', csrf_exempt(obtain_auth_token), name='api_token_auth'),
+    path('auth/token/', csrf_exempt(ObtainExpiringAuthToken.as_view()), name='api_token_auth'),
     path('users/register/', UserViewSet.as_view({'post': 'register'}), name='user-register'),
     path('users/select_career_paths/', UserViewSet.as_view({'post': 'select_career_paths'}), name='user-select-career-paths'),
-] 
\ No newline at end of file
+]
+
+# Async views for the hot read paths, under the same names as the router's
+# routes. career_craft/asgi_urls.py puts them first for the ASGI application.
+# Track slugs exclude the viewset's list actions (recommendations), which
+# the router matches before its detail routes.
+_list_actions = '|'.join(action.url_path for action in CareerTrackViewSet.get_extra_actions() if not action.detail)
+_track = rf'^career-tracks/(?!(?:{_list_actions})/)(?P<slug>[^/.]+)'
+
+async_urlpatterns = [
+    path('career-tracks/', async_views.career_track_list, name='career-track-list'),
+    re_path(rf'{_track}/$', async_views.career_track_detail, name='career-track-detail'),
+    re_path(rf'{_track}/learning_page/$', async_views.learning_page, name='career-track-learning-page'),
+    path('interests/', async_views.interest_list, name='interest-list'),
+    path('users/me/', async_views.user_me, name='user-me'),
+]
@@ -1,20 +1,28 @@
+from functools import partial
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
+from django.contrib import auth
 from django.contrib.auth import get_user_model
-from .models import Quiz, Question, Progress, Interest, CareerTrack, OnboardingQuestion, UserAnswer, LearningPage, PageSection
+from django.db.models import Case, When
+from django.http import Http404
+from .models import Quiz, Question, Progress, Interest, CareerTrack, OnboardingQuestion, UserAnswer, PageSection
 from .serializers import (
     UserSerializer, QuizSerializer,
     ProgressSerializer, UserRegistrationSerializer, InterestSerializer, CareerTrackSerializer,
-    OnboardingQuestionSerializer, UserAnswerSerializer, QuestionSerializer,
-    LearningPageSerializer, PageSectionSerializer
+    OnboardingQuestionSerializer, UserAnswerSerializer, BulkUserAnswerSerializer, QuestionSerializer,
+    PageSectionSerializer
 )
-from django.db.models import Count
+from .pagination import StreamingListMixin
+from .recommendations import rank_tracks
+from . import authentication, fast_serializers, instrumentation, leaderboard, page_cache, sampling, scoring, xp_buffer
 from rest_framework.authtoken.models import Token
+from rest_framework.authtoken.views import ObtainAuthToken
 
 CustomUser = get_user_model()
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(StreamingListMixin, viewsets.ModelViewSet):
     queryset = CustomUser.objects.all()
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -31,20 +39,33 @@ class UserViewSet(viewsets.ModelViewSet):
     def me(self, request):
         # Returns the currently authenticated user's data
         serializer = self.get_serializer(request.user)
-        return Response(serializer.data)
+        data = serializer.data
+        if xp_buffer.enabled():
+            # Include the XP still pending in this worker's write-behind buffer
+            data['xp'] = xp_buffer.user_xp(request.user.pk)
+        return Response(data)
 
     @action(detail=False, methods=['post'], permission_classes=[permissions.AllowAny])
     def register(self, request):
         serializer = UserRegistrationSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.save()
-            token, created = Token.objects.get_or_create(user=user)
+            token = authentication.issue_token(user)
             return Response({
                 'user': UserSerializer(user).data,
                 'token': token.key
             }, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=False, methods=['post'], permission_classes=[permissions.IsAuthenticated])
+    def logout(self, request):
+        # Deletes the token the request came with, or ends the session
+        if isinstance(request.auth, Token):
+            request.auth.delete()
+        else:
+            auth.logout(request._request)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
     @action(detail=False, methods=['patch'], permission_classes=[permissions.IsAuthenticated])
     def update_interests(self, request):
         user = self.request.user
@@ -53,7 +74,7 @@ class UserViewSet(viewsets.ModelViewSet):
             user.interests = interests
             # Set onboarding_complete to True after interests are updated
             user.onboarding_complete = True
-            user.save()
+            user.save(update_fields=['interests', 'onboarding_complete'])
             # Return updated user data with onboarding_complete status
             return Response(UserSerializer(user).data, status=status.HTTP_200_OK)
         return Response({'error': 'Invalid interests data'}, status=status.HTTP_400_BAD_REQUEST)
@@ -64,7 +85,7 @@ class UserViewSet(viewsets.ModelViewSet):
         preferences = request.data.get('preferences')
         if preferences is not None and isinstance(preferences, dict):
             user.preferences = preferences
-            user.save()
+            user.save(update_fields=['preferences'])
             # Return updated user data with onboarding_complete status
             return Response(UserSerializer(user).data, status=status.HTTP_200_OK)
         return Response({'error': 'Invalid preferences data'}, status=status.HTTP_400_BAD_REQUEST)
@@ -78,26 +99,10 @@ class UserViewSet(viewsets.ModelViewSet):
             # This case should ideally be handled by frontend navigation, but as a fallback:
             return Response({'error': 'User has not selected interests.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Get interest objects based on user's saved interest names
-        matching_interests = Interest.objects.filter(name__in=user_interests_names)
-
-        # Calculate overlap with career tracks
-        career_track_scores = []
-        for track in CareerTrack.objects.all():
-            # Calculate overlap based on matching interest objects
-            overlap = track.relevant_interests.filter(id__in=matching_interests.values_list('id', flat=True)).count()
-            if overlap > 0:
-                career_track_scores.append({
-                    'track': track,
-                    'score': overlap
-                })
-
-        # Sort by score in descending order and return all relevant tracks
-        sorted_tracks = sorted(career_track_scores, key=lambda x: x['score'], reverse=True)
-        recommended_tracks = [item['track'] for item in sorted_tracks]
-
-        serializer = CareerTrackSerializer(recommended_tracks, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        # Return all tracks sharing at least one interest, best match first
+        ranked = rank_tracks(user_interests_names)
+        data = fast_serializers.career_tracks_by_id([track_id for track_id, _ in ranked])
+        return Response(data, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def select_career_paths(self, request):
@@ -117,12 +122,24 @@ class UserViewSet(viewsets.ModelViewSet):
 
         # Update the user's selected career paths
         user.selected_career_paths = career_track_ids
-        user.save()
+        user.save(update_fields=['selected_career_paths'])
 
         serializer = UserSerializer(user)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
-class QuizViewSet(viewsets.ModelViewSet):
+class ObtainExpiringAuthToken(ObtainAuthToken):
+    # obtain_auth_token, but an expired token is replaced with a new one.
+    # Credentials come from the body only, so a stale token header can't
+    # lock a client out of logging in again
+    authentication_classes = []
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        token = authentication.issue_token(serializer.validated_data['user'])
+        return Response({'token': token.key})
+
+class QuizViewSet(StreamingListMixin, viewsets.ModelViewSet):
     queryset = Quiz.objects.all()
     serializer_class = QuizSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -131,44 +148,118 @@ class QuizViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def submit_answer(self, request, pk=None):
         quiz = self.get_object()
-        answer_text = request.data.get('answer') # Changed from 'answer' to 'answer_text' to match frontend potential payload structure if needed
+        question_id = request.data.get('question')
+        answer_text = request.data.get('answer')
 
-        if not answer_text:
+        if not answer_text or question_id is None:
             return Response(
-                {'error': 'Answer is required'},
+                {'error': 'Question and answer are required'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # TODO: Implement logic to check the answer and update user's XP/streak/progress
-        user = request.user
-        # For now, just simulate earning XP
-        xp_earned = 10
-        user.xp += xp_earned
-        user.streak += 1 # Basic streak increment, needs proper logic
-        user.save()
-
-        # TODO: Update Progress model for the user and the relevant career path/day
-        # Example (simplified): Find or create progress for this user/career and increment days_completed, update XP
-        # progress_obj, created = Progress.objects.get_or_create(user=user, career=quiz.career)
-        # progress_obj.days_completed += 1
-        # progress_obj.xp += xp_earned
-        # progress_obj.save()
+        try:
+            question = quiz.questions.filter(pk=int(question_id)).first()
+        except (TypeError, ValueError):
+            question = None
+        if question is None:
+            return Response(
+                {'error': 'Question does not belong to this quiz'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            correct = scoring.grade(question, answer_text)
+        except scoring.InvalidAnswer as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        result = scoring.apply_results(request.user, quiz.career_id, [correct])
+        return Response({
+            'message': 'Answer submitted successfully',
+            'correct': correct,
+            **result,
+        })
+
+    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
+    def submit_batch(self, request, pk=None):
+        # Grades a whole day's answers in one request: [{question, answer}, ...]
+        quiz = self.get_object()
+        answers = request.data.get('answers')
+
+        if not isinstance(answers, list) or not answers:
+            return Response(
+                {'error': 'Invalid data format. Expected a list of answers.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
+        # Load every question of the day in one query and grade in memory
+        questions = {question.pk: question for question in quiz.questions.all()}
+        graded = []
+        answered = set()
+        for item in answers:
+            try:
+                question = questions.get(int(item.get('question')))
+            except (AttributeError, TypeError, ValueError):
+                question = None
+            if question is None:
+                return Response(
+                    {'error': 'One or more questions do not belong to this quiz.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if question.pk in answered:
+                return Response(
+                    {'error': f'Question {question.pk} was answered more than once.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            answered.add(question.pk)
+            try:
+                graded.append((question, scoring.grade(question, item.get('answer'))))
+            except scoring.InvalidAnswer as e:
+                return Response({'error': f'Question {question.pk}: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # The day counts as completed once every question has been answered
+        completed_day = quiz.day if len(graded) == len(questions) else None
+        result = scoring.apply_results(
+            request.user, quiz.career_id, [correct for _, correct in graded], completed_day=completed_day
+        )
         return Response({
-            'message': 'Answer submitted successfully (dummy logic)',
-            'xp_gained': xp_earned,
-            'current_xp': user.xp,
-            'current_streak': user.streak,
-            # 'days_completed': progress_obj.days_completed # if implementing progress update
+            'message': 'Answers submitted successfully',
+            'results': [{'question': question.pk, 'correct': correct} for question, correct in graded],
+            **result,
         })
 
-class ProgressViewSet(viewsets.ModelViewSet):
+class ProgressViewSet(StreamingListMixin, viewsets.ModelViewSet):
     serializer_class = ProgressSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
         # Ensure users can only see their own progress
-        return Progress.objects.filter(user=self.request.user)
+        queryset = Progress.objects.filter(user=self.request.user).select_related('career').prefetch_related('career__relevant_interests')
+        if xp_buffer.enabled():
+            # For the days among the pending ones that are already stored
+            queryset = queryset.prefetch_related('completed_days')
+        return queryset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if xp_buffer.enabled() and self.request.user.is_authenticated:
+            # Write-behind XP this worker hasn't flushed yet, for ProgressSerializer
+            context['pending'] = xp_buffer.pending_progress(self.request.user.pk)
+        return context
+
+    def wants_stream(self, request):
+        # Streamed rows are read after the response has started, too late to
+        # retry around a flush; the plain list has the same bytes
+        return not xp_buffer.enabled() and super().wants_stream(request)
+
+    def list(self, request, *args, **kwargs):
+        if xp_buffer.enabled():
+            return xp_buffer.consistent(partial(super().list, request, *args, **kwargs))
+        return super().list(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        if xp_buffer.enabled():
+            return xp_buffer.consistent(partial(super().retrieve, request, *args, **kwargs))
+        return super().retrieve(request, *args, **kwargs)
 
     def perform_create(self, serializer):
         # Ensure progress is linked to the authenticated user
@@ -181,17 +272,94 @@ class ProgressViewSet(viewsets.ModelViewSet):
     #     # Implement logic to update progress based on challenge completion
     #     return Response({'status': 'progress updated'})
 
-class InterestViewSet(viewsets.ReadOnlyModelViewSet):
+class LeaderboardViewSet(viewsets.ViewSet):
+    # Global ranking by CustomUser.xp, or per track by Progress.xp with ?career=<slug>
+    permission_classes = [permissions.IsAuthenticated]
+
+    def parse_int(self, name, default, maximum):
+        try:
+            return max(0, min(int(self.request.query_params.get(name, default)), maximum))
+        except ValueError:
+            return None
+
+    def get_career_id(self):
+        slug = self.request.query_params.get('career')
+        if slug is None:
+            return None
+        return CareerTrack.objects.filter(slug=slug).values_list('id', flat=True).first() or False
+
+    def entries(self, ranked):
+        usernames = dict(CustomUser.objects.filter(id__in=[user_id for _, user_id, _ in ranked]).values_list('id', 'username'))
+        return [
+            {'rank': rank, 'user_id': user_id, 'username': usernames.get(user_id), 'xp': xp}
+            for rank, user_id, xp in ranked
+        ]
+
+    def list(self, request):
+        limit = self.parse_int('limit', 10, 100)
+        if limit is None:
+            return Response({'error': 'Invalid limit'}, status=status.HTTP_400_BAD_REQUEST)
+        career_id = self.get_career_id()
+        if career_id is False:
+            return Response({'error': 'Career track not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response(self.entries(leaderboard.top(limit, career_id)))
+
+    @action(detail=False, methods=['get'])
+    def me(self, request):
+        # The user's rank and the users just above and below them
+        radius = self.parse_int('around', 2, 50)
+        if radius is None:
+            return Response({'error': 'Invalid around'}, status=status.HTTP_400_BAD_REQUEST)
+        career_id = self.get_career_id()
+        if career_id is False:
+            return Response({'error': 'Career track not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        rank, neighbours = leaderboard.standing(request.user.pk, radius, career_id)
+        return Response({'rank': rank, 'neighbours': self.entries(neighbours)})
+
+class MetricsViewSet(viewsets.ViewSet):
+    # This worker's per-route request histograms, see api/instrumentation.py
+    permission_classes = [permissions.IsAdminUser]
+
+    def list(self, request):
+        return Response(instrumentation.snapshot())
+
+    @action(detail=False, methods=['post'])
+    def reset(self, request):
+        instrumentation.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+class InterestViewSet(StreamingListMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Interest.objects.all()
     serializer_class = InterestSerializer
     permission_classes = [permissions.AllowAny]
 
-class CareerTrackViewSet(viewsets.ReadOnlyModelViewSet):
+class CareerTrackViewSet(StreamingListMixin, viewsets.ReadOnlyModelViewSet):
     queryset = CareerTrack.objects.all()
     serializer_class = CareerTrackSerializer
     permission_classes = [permissions.AllowAny]  # Make it publicly accessible
     lookup_field = 'slug'
 
+    def get_queryset(self):
+        # Streamed and paged lists render interests for many tracks at once
+        if self.action == 'list':
+            return self.queryset.prefetch_related('relevant_interests')
+        return super().get_queryset()
+
+    # Plain lists, single tracks and pages are read-only payloads built by
+    # fast_serializers, which render the same JSON as the serializers
+    def list(self, request, *args, **kwargs):
+        if not self.wants_plain_list(request):
+            return super().list(request, *args, **kwargs)
+        return Response(fast_serializers.career_tracks(self.filter_queryset(CareerTrack.objects.all())))
+
+    def retrieve(self, request, *args, **kwargs):
+        tracks = fast_serializers.career_tracks(CareerTrack.objects.filter(slug=self.kwargs[self.lookup_field]))
+        if not tracks:
+            raise Http404
+        return Response(tracks[0])
+
     def get_object(self):
         # Check if we're looking up by ID
         if 'pk' in self.kwargs and self.kwargs['pk'].isdigit():
@@ -202,9 +370,7 @@ class CareerTrackViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=True, methods=['get'])
     def learning_pages(self, request, slug=None):
         career_track = self.get_object()
-        learning_pages = career_track.learning_pages.all()
-        serializer = LearningPageSerializer(learning_pages, many=True)
-        return Response(serializer.data)
+        return Response(fast_serializers.learning_pages(career_track.learning_pages.all()))
 
     @action(detail=True, methods=['get'])
     def learning_page(self, request, slug=None):
@@ -217,16 +383,21 @@ class CareerTrackViewSet(viewsets.ReadOnlyModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        # Serve the pre-rendered page when we have it, skipping the database
+        # and serialization entirely
+        lookup = self.kwargs[self.lookup_field]
+        cached = page_cache.get(lookup, page_number)
+        if cached is not None:
+            return page_cache.respond(request, cached)
+
         career_track = self.get_object()
-        try:
-            learning_page = career_track.learning_pages.get(page_number=page_number)
-            serializer = LearningPageSerializer(learning_page)
-            return Response(serializer.data)
-        except LearningPage.DoesNotExist:
+        pages = fast_serializers.learning_pages(career_track.learning_pages.filter(page_number=page_number))
+        if not pages:
             return Response(
                 {'error': f'Page {page_number} not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
+        return page_cache.respond(request, page_cache.store(lookup, page_number, pages[0]))
 
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def recommendations(self, request):
@@ -237,37 +408,34 @@ class CareerTrackViewSet(viewsets.ReadOnlyModelViewSet):
             # This case should ideally be handled by frontend navigation, but as a fallback:
             return Response({'error': 'User has not selected interests.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Get interest objects based on user's saved interest names
-        matching_interests = Interest.objects.filter(name__in=user_interests_names)
-
-        # Calculate overlap with career tracks
-        career_track_scores = []
-        for track in CareerTrack.objects.all():
-            # Calculate overlap based on matching interest objects
-            overlap = track.relevant_interests.filter(id__in=matching_interests.values_list('id', flat=True)).count()
-            career_track_scores.append({
-                'track': track,
-                'score': overlap
-            })
-
-        # Sort by score in descending order and get top 4
-        sorted_tracks = sorted(career_track_scores, key=lambda x: x['score'], reverse=True)
-        # Filter for tracks with at least one matching interest before taking top 4
-        top_4_recommendations = [item['track'] for item in sorted_tracks if item['score'] > 0][:4]
-
-        serializer = CareerTrackSerializer(top_4_recommendations, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        # Top 4 tracks sharing at least one interest, best match first
+        top_4_recommendations = rank_tracks(user_interests_names, limit=4)
+        data = fast_serializers.career_tracks_by_id([track_id for track_id, _ in top_4_recommendations])
+        return Response(data, status=status.HTTP_200_OK)
 
 class OnboardingQuestionViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = OnboardingQuestion.objects.all()
     serializer_class = OnboardingQuestionSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # A small sample in its own order, not a list to page through
+    pagination_class = None
 
-    def get_queryset(self):
-        # Return 5 random questions
-        return OnboardingQuestion.objects.order_by('?')[:5]
+    sample_size = 5
 
-class UserAnswerViewSet(viewsets.ModelViewSet):
+    def get_queryset(self):
+        # Return 5 random questions, the same ones for a user until they pass
+        # a different ?seed=, optionally spread by ?stratify=type or tag
+        stratify = self.request.query_params.get('stratify')
+        if stratify not in (None, 'type', 'tag'):
+            raise ValidationError({'stratify': 'Must be "type" or "tag".'})
+        seed = f"{self.request.user.pk}:{self.request.query_params.get('seed', '')}"
+        question_ids = sampling.sample_questions(self.sample_size, seed=seed, stratify=stratify)
+        if not question_ids:
+            return OnboardingQuestion.objects.none()
+        order = Case(*[When(pk=pk, then=position) for position, pk in enumerate(question_ids)])
+        return OnboardingQuestion.objects.filter(pk__in=question_ids).order_by(order)
+
+class UserAnswerViewSet(StreamingListMixin, viewsets.ModelViewSet):
     serializer_class = UserAnswerSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -277,27 +445,26 @@ class UserAnswerViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    def skill_tags_response(self, profile, status=status.HTTP_200_OK):
+        skill_tags = sorted(profile, key=lambda tag: (-profile[tag], tag))
+        return Response({'skill_tags': skill_tags, 'weights': profile}, status=status)
+
     @action(detail=False, methods=['get'])
     def user_skill_tags(self, request):
-        # Get all answers for the user
-        answers = UserAnswer.objects.filter(user=request.user).select_related('question')
-        
-        # Collect all tags from answered questions
-        skill_tags = set()
-        for answer in answers:
-            question = answer.question
-            if question.type == 'yes_no' and answer.answer:
-                skill_tags.update(question.tags)
-            elif question.type == 'multi_choice':
-                # For multi-choice, we could add logic to map specific answers to specific tags
-                skill_tags.update(question.tags)
-            elif question.type == 'scale_1_5' and answer.answer >= 4:
-                # For scale questions, only include tags if the answer is high (4 or 5)
-                skill_tags.update(question.tags)
-        
-        return Response({'skill_tags': list(skill_tags)})
-
-class QuestionViewSet(viewsets.ModelViewSet):
+        # The profile is kept up to date as answers change, so this is just
+        # the user row authentication already loaded
+        return self.skill_tags_response(request.user.skill_profile)
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        # Saves every onboarding answer in one request: {answers: [{question, answer}, ...]}
+        serializer = BulkUserAnswerSerializer(data=request.data, context={'request': request})
+        if serializer.is_valid():
+            serializer.save()
+            return self.skill_tags_response(request.user.skill_profile, status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+class QuestionViewSet(StreamingListMixin, viewsets.ModelViewSet):
     queryset = Question.objects.all()
     serializer_class = QuestionSerializer
     permission_classes = [permissions.IsAuthenticated] 
\ No newline at end of file
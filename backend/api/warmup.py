@@ -0,0 +1,218 @@
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from io import BytesIO
+from django.conf import settings
+from django.db import connection, connections
+from django.urls import URLResolver, get_resolver
+from django.utils import translation
+from rest_framework import serializers as drf_serializers
+from rest_framework.settings import api_settings
+
+# Optional warm-up for new workers (settings.API_WARMUP). A fresh worker
+# otherwise pays on its first requests for compiling every URL pattern,
+# DRF's lazily imported classes, serializer field introspection, the
+# translation catalogues, the database connection and the per-worker
+# indexes (interest index, onboarding sampler pool, leaderboard). With
+# API_WARMUP on, ApiConfig.ready() runs the stages that need no database and
+# career_craft/wsgi.py and asgi.py run the rest once the application is
+# loaded, since Django discourages queries while apps are initializing, and
+# then close the connections they opened: under gunicorn --preload that runs
+# in the master process, and forked workers must not share its socket.
+#
+# The warmup management command runs every stage in its own process, or
+# with --profile starts cold workers, with and without warm-up, under
+# python -X importtime and reports import time per module, the time each
+# stage took and the latency of each worker's first requests, which --check
+# holds to API_WARMUP_BUDGET_MS.
+
+# Stage name -> milliseconds, for what this process ran
+timings = {}
+
+_IMPORT_TIME = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| +(\S+)')
+
+
+def enabled():
+    return getattr(settings, 'API_WARMUP', False)
+
+
+def budget_ms():
+    return getattr(settings, 'API_WARMUP_BUDGET_MS', 100)
+
+
+def _patterns(resolver):
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, URLResolver):
+            yield from _patterns(pattern)
+        yield pattern
+
+
+def urls():
+    # Import the URLconf (building the router's routes), compile every
+    # pattern's regex and fill the resolver's reverse lookup tables
+    resolver = get_resolver()
+    for pattern in _patterns(resolver):
+        pattern.pattern.regex
+    resolver.reverse_dict
+
+
+def drf():
+    # DRF imports its default classes on first use
+    for name in (
+        'DEFAULT_AUTHENTICATION_CLASSES', 'DEFAULT_PERMISSION_CLASSES', 'DEFAULT_RENDERER_CLASSES',
+        'DEFAULT_PARSER_CLASSES', 'DEFAULT_PAGINATION_CLASS', 'DEFAULT_CONTENT_NEGOTIATION_CLASS',
+        'DEFAULT_METADATA_CLASS', 'EXCEPTION_HANDLER',
+    ):
+        getattr(api_settings, name)
+
+
+def serializers():
+    # Field introspection fills the models' _meta caches
+    from . import serializers as api_serializers
+    for serializer in vars(api_serializers).values():
+        if (
+            isinstance(serializer, type) and issubclass(serializer, drf_serializers.ModelSerializer)
+            and serializer.__module__ == api_serializers.__name__ and hasattr(serializer, 'Meta')
+        ):
+            serializer().fields
+
+
+def translations():
+    with translation.override(settings.LANGUAGE_CODE):
+        translation.gettext('Not found.')
+
+
+def database():
+    connection.ensure_connection()
+
+
+def indexes():
+    from . import interest_index, leaderboard, sampling
+    interest_index.get_index()
+    sampling.get_pool()
+    leaderboard.get_board()
+
+
+def catalogue():
+    # The hot read queries, on one track
+    from . import fast_serializers
+    from .models import CareerTrack, LearningPage
+    tracks = fast_serializers.career_tracks(CareerTrack.objects.order_by('pk')[:1])
+    fast_serializers.learning_pages(LearningPage.objects.filter(career_track_id__in=[t['id'] for t in tracks])[:1])
+
+
+# (name, function), in order; the database stages run from the application
+STAGES = [('urls', urls), ('drf', drf), ('serializers', serializers), ('translations', translations)]
+DATABASE_STAGES = [('database', database), ('indexes', indexes), ('catalogue', catalogue)]
+
+
+def run(stages):
+    for name, stage in stages:
+        start = time.perf_counter()
+        stage()
+        timings[name] = round((time.perf_counter() - start) * 1000, 3)
+    return timings
+
+
+def on_ready():
+    if enabled():
+        run(STAGES)
+
+
+def on_serve():
+    if enabled():
+        try:
+            run(DATABASE_STAGES)
+        finally:
+            connections.close_all()
+
+
+def first_requests(application, paths):
+    # Sends GET paths through a WSGI application in order; returns a list of
+    # {path, status, ms}
+    results = []
+    for path in paths:
+        path, _, query = path.partition('?')
+        environ = {
+            'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query, 'SCRIPT_NAME': '',
+            'SERVER_NAME': '127.0.0.1', 'SERVER_PORT': '80', 'HTTP_HOST': '127.0.0.1', 'REMOTE_ADDR': '127.0.0.1',
+            'wsgi.input': BytesIO(), 'wsgi.errors': sys.stderr, 'wsgi.url_scheme': 'http', 'wsgi.version': (1, 0),
+            'wsgi.multithread': False, 'wsgi.multiprocess': True, 'wsgi.run_once': False,
+        }
+        status = []
+        start = time.perf_counter()
+        response = application(environ, lambda line, headers, exc_info=None: status.append(line))
+        try:
+            b''.join(response)
+        finally:
+            response.close()
+        results.append({
+            'path': path + (f'?{query}' if query else ''), 'status': int(status[0].split()[0]),
+            'ms': round((time.perf_counter() - start) * 1000, 3),
+        })
+    return results
+
+
+# Runs in the cold worker: loads the WSGI application and sends it paths
+_COLD_WORKER = '''
+import json, sys, time
+start = time.perf_counter()
+from career_craft.wsgi import application
+loaded = time.perf_counter()
+from api import warmup
+requests = warmup.first_requests(application, json.loads(sys.argv[1]))
+print(json.dumps({'load_ms': round((loaded - start) * 1000, 3), 'stages': warmup.timings, 'requests': requests}))
+'''
+
+
+def parse_import_times(lines, top=20):
+    # -X importtime output, in milliseconds: the total, the time spent in
+    # each top-level package's modules and the slowest modules
+    modules = []
+    for line in lines:
+        match = _IMPORT_TIME.match(line)
+        if match:
+            name, own = match.group(3), int(match.group(1)) / 1000
+            modules.append((name, own))
+    packages = {}
+    for name, own in modules:
+        package = name.split('.')[0]
+        packages[package] = packages.get(package, 0) + own
+    return {
+        'total_ms': round(sum(own for _, own in modules), 3),
+        'packages': {
+            name: round(own, 3) for name, own in sorted(packages.items(), key=lambda package: -package[1])[:top]
+        },
+        'slowest_modules': {name: round(own, 3) for name, own in sorted(modules, key=lambda module: -module[1])[:top]},
+    }
+
+
+def profile(paths, warm, top=20):
+    # Starts a cold worker (with API_WARMUP on or off) and reports its
+    # import times, load and warm-up stage times and first requests
+    env = dict(os.environ, API_WARMUP='1' if warm else '0')
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _COLD_WORKER, json.dumps(paths)],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+    )
+    if process.returncode:
+        raise RuntimeError(f'Cold worker failed:\n{process.stderr[-2000:]}')
+    report = json.loads(process.stdout.strip().splitlines()[-1])
+    report['imports'] = parse_import_times(process.stderr.splitlines(), top)
+    report['first_request_ms'] = report['requests'][0]['ms'] if report['requests'] else None
+    report['slowest_request_ms'] = max((request['ms'] for request in report['requests']), default=None)
+    return report
+
+
+def hot_paths():
+    # The hot read endpoints, on the first track that has a page
+    from .models import LearningPage
+    paths = ['/api/career-tracks/', '/api/interests/']
+    page = LearningPage.objects.select_related('career_track').order_by('pk').first()
+    if page is not None:
+        slug = page.career_track.slug
+        paths[1:1] = [f'/api/career-tracks/{slug}/', f'/api/career-tracks/{slug}/learning_page/?page={page.page_number}']
+    return paths
@@ -0,0 +1,372 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from . import authentication
+from .models import CompletedDay, Progress
+
+# Optional write-behind mode for quiz scoring (settings.XP_WRITE_BEHIND).
+# Instead of updating the hot CustomUser row on every answer, scoring appends
+# a delta to a per-process journal file and keeps it in memory. Pending
+# deltas are coalesced per user and per (user, career) and flushed in one
+# transaction by a background thread. Journals left behind by a crashed
+# worker are replayed by the flush_xp_journal management command. Delivery
+# is at-least-once: a crash between committing a flush and deleting its
+# journal replays that journal again.
+#
+# Reads through this module see the worker's own pending deltas: the
+# scoring response (totals()), users/me (user_xp()), leaderboards as they
+# load (overlay_scores()) and the progress endpoints (pending_progress()). A
+# user sees their XP immediately as long as
+# they keep hitting the same worker; deltas pending on other workers show up
+# once those flush, within XP_WRITE_BEHIND_FLUSH_INTERVAL. Neither a flush's
+# transaction nor a read's queries run under _lock, so scoring never waits
+# on the database: a flush swaps the pending deltas out, and until it
+# commits readers count them as in flight.
+
+CustomUser = get_user_model()
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.RLock()
+_users = {}
+_progress = {}
+# The deltas a flush is applying, and one flush at a time
+_flushing_users = {}
+_flushing_progress = {}
+_flush_lock = threading.Lock()
+_journal = None
+_rotated = []
+_flusher = None
+# Flushes applied so far, so readers can tell one landed during their read
+_flushes = 0
+
+
+class Delta:
+    # A coalesced change to xp/streak/completed days. The streak is either
+    # extended (reset=False) or set to a value (reset=True); merging keeps the
+    # order of operations, so replaying a merged delta equals replaying each.
+    __slots__ = ('xp', 'streak', 'reset', 'completed_days')
+
+    def __init__(self, xp=0, streak=0, reset=False, completed_days=()):
+        self.xp = xp
+        self.streak = streak
+        self.reset = reset
+        self.completed_days = frozenset(completed_days)
+
+    def merge(self, other):
+        self.xp += other.xp
+        if other.reset:
+            self.reset = True
+            self.streak = other.streak
+        else:
+            self.streak += other.streak
+        self.completed_days |= other.completed_days
+
+    def streak_expression(self):
+        return self.streak if self.reset else F('streak') + self.streak
+
+    def overlay_streak(self, streak):
+        return self.streak if self.reset else streak + self.streak
+
+    def overlay_days(self, days_completed, stored_days):
+        # days_completed plus the days not among those already stored
+        return days_completed + len(self.completed_days.difference(stored_days))
+
+    def to_json(self, user_id, career_id):
+        return json.dumps({
+            'user': user_id, 'career': career_id, 'xp': self.xp,
+            'streak': self.streak, 'reset': self.reset, 'days': sorted(self.completed_days),
+        })
+
+    @classmethod
+    def from_json(cls, line):
+        event = json.loads(line)
+        # Older journals have the one day, or None, under 'day'
+        days = event['days'] if 'days' in event else [event['day']] if event.get('day') is not None else []
+        delta = cls(event['xp'], event['streak'], event['reset'], days)
+        return event['user'], event['career'], delta
+
+
+def enabled():
+    return getattr(settings, 'XP_WRITE_BEHIND', False)
+
+
+def journal_dir():
+    return Path(getattr(settings, 'XP_WRITE_BEHIND_DIR', settings.BASE_DIR / 'xp_journal'))
+
+
+def _journal_path():
+    return journal_dir() / f'xp-{os.getpid()}.journal'
+
+
+def _append(line):
+    global _journal
+    if _journal is None:
+        path = _journal_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _journal = open(path, 'a', encoding='utf-8')
+    _journal.write(line + '\n')
+    _journal.flush()
+    if getattr(settings, 'XP_WRITE_BEHIND_FSYNC', False):
+        os.fsync(_journal.fileno())
+
+
+def _merge(users, progress, user_id, career_id, delta):
+    users.setdefault(user_id, Delta()).merge(delta)
+    progress.setdefault((user_id, career_id), Delta()).merge(delta)
+
+
+def record(user_id, career_id, delta):
+    # The journal line is written before the delta counts as accepted
+    with _lock:
+        _append(delta.to_json(user_id, career_id))
+        _merge(_users, _progress, user_id, career_id, delta)
+    _start_flusher()
+
+
+def _combined(*deltas):
+    combined = None
+    for delta in deltas:
+        if delta is not None:
+            if combined is None:
+                combined = Delta()
+            combined.merge(delta)
+    return combined
+
+
+def _user_delta(user_id):
+    # What the database doesn't have yet for the user: in flight, then pending
+    return _combined(_flushing_users.get(user_id), _users.get(user_id))
+
+
+def _progress_delta(user_id, career_id):
+    key = (user_id, career_id)
+    return _combined(_flushing_progress.get(key), _progress.get(key))
+
+
+def consistent(read, overlay=lambda result: result):
+    # overlay(read()) with read() querying the database outside the lock and
+    # overlay() merging unflushed deltas under it. A flush committing in
+    # between moves deltas into the database, where read() may or may not
+    # have seen them, so the read is retried.
+    while True:
+        with _lock:
+            flushes = _flushes
+        result = read()
+        with _lock:
+            if _flushes == flushes:
+                return overlay(result)
+
+
+def totals(user_id, career_id):
+    # Database totals plus this worker's pending deltas:
+    # (xp, streak, days_completed, career xp)
+    def read():
+        xp, streak = CustomUser.objects.filter(pk=user_id).values_list('xp', 'streak').get()
+        days_completed, career_xp = (
+            Progress.objects.filter(user_id=user_id, career_id=career_id)
+            .values_list('days_completed', 'xp').first()
+        ) or (0, 0)
+        stored_days = set(
+            CompletedDay.objects.filter(progress__user_id=user_id, progress__career_id=career_id)
+            .values_list('day', flat=True)
+        )
+        return xp, streak, days_completed, career_xp, stored_days
+
+    def overlay(result):
+        xp, streak, days_completed, career_xp, stored_days = result
+        user_delta = _user_delta(user_id)
+        if user_delta is not None:
+            xp += user_delta.xp
+            streak = user_delta.overlay_streak(streak)
+        progress_delta = _progress_delta(user_id, career_id)
+        if progress_delta is not None:
+            career_xp += progress_delta.xp
+            days_completed = progress_delta.overlay_days(days_completed, stored_days)
+        return xp, streak, days_completed, career_xp
+
+    return consistent(read, overlay)
+
+
+def user_xp(user_id):
+    # The user's XP from the database plus this worker's pending deltas
+    def overlay(xp):
+        delta = _user_delta(user_id)
+        return xp if delta is None else xp + delta.xp
+
+    return consistent(lambda: CustomUser.objects.filter(pk=user_id).values_list('xp', flat=True).get(), overlay)
+
+
+def overlay_scores(load, career_id=None):
+    # load() builds a leaderboard index (api/leaderboard.py) from the
+    # database; the pending deltas are added to its scores
+    def overlay(index):
+        if career_id is None:
+            pending = [(user_id, delta.xp) for deltas in (_flushing_users, _users) for user_id, delta in deltas.items()]
+        else:
+            pending = [
+                (user_id, delta.xp)
+                for deltas in (_flushing_progress, _progress)
+                for (user_id, career), delta in deltas.items() if career == career_id
+            ]
+        for user_id, xp in pending:
+            index.update(user_id, index.scores.get(user_id, 0) + xp)
+        return index
+
+    return consistent(load, overlay)
+
+
+def pending_progress(user_id):
+    # career_id -> the user's unflushed delta for that career. For reads
+    # that run inside consistent(), which retries them if a flush commits.
+    with _lock:
+        keys = {key for deltas in (_flushing_progress, _progress) for key in deltas if key[0] == user_id}
+        return {career_id: _progress_delta(user_id, career_id) for _, career_id in keys}
+
+
+def apply(users, progress):
+    # One UPDATE per user and per Progress row, however many events they had
+    with transaction.atomic():
+        for user_id, delta in users.items():
+            CustomUser.objects.filter(pk=user_id).update(
+                xp=F('xp') + delta.xp, streak=delta.streak_expression()
+            )
+            authentication.invalidate_user(user_id)
+        for (user_id, career_id), delta in progress.items():
+            update = {'xp': F('xp') + delta.xp, 'streak': delta.streak_expression(), 'last_attempt': timezone.now()}
+            progress_row, _ = Progress.objects.get_or_create(user_id=user_id, career_id=career_id)
+            # Replayed or repeated days count once
+            new_days = CompletedDay.record(progress_row.pk, sorted(delta.completed_days))
+            if new_days:
+                update['days_completed'] = F('days_completed') + new_days
+            Progress.objects.filter(pk=progress_row.pk).update(**update)
+
+
+def flush():
+    # Applies this worker's pending deltas and returns how many users changed
+    global _journal, _users, _progress, _flushing_users, _flushing_progress, _flushes
+    with _flush_lock:
+        with _lock:
+            if not _users:
+                return 0
+            # Move the journal aside first; if applying fails, the deltas go
+            # back to pending and the rotated file is still there for a replay
+            if _journal is not None:
+                _journal.close()
+                _journal = None
+                rotated = _journal_path().with_suffix(f'.{time.time_ns()}.flushing')
+                os.replace(_journal_path(), rotated)
+                _rotated.append(rotated)
+            _flushing_users, _flushing_progress = _users, _progress
+            _users, _progress = {}, {}
+
+        locked = False
+        try:
+            with transaction.atomic():
+                apply(_flushing_users, _flushing_progress)
+                # Hold the lock over the commit, so that no reader sees the
+                # rows committed while _flushes says they are still in flight
+                _lock.acquire()
+                locked = True
+        except BaseException:
+            if not locked:
+                _lock.acquire()
+                locked = True
+            # Back to pending, ahead of whatever was recorded meanwhile
+            for user_id, delta in _users.items():
+                _flushing_users.setdefault(user_id, Delta()).merge(delta)
+            for key, delta in _progress.items():
+                _flushing_progress.setdefault(key, Delta()).merge(delta)
+            _users, _progress = _flushing_users, _flushing_progress
+            raise
+        else:
+            flushed = len(_flushing_users)
+            _flushes += 1
+            for path in _rotated:
+                path.unlink(missing_ok=True)
+            _rotated.clear()
+            return flushed
+        finally:
+            _flushing_users, _flushing_progress = {}, {}
+            if locked:
+                _lock.release()
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def orphaned_journals():
+    # Journal files whose worker is gone, including interrupted flushes
+    own = os.getpid()
+    for path in sorted(journal_dir().glob('xp-*')):
+        try:
+            pid = int(path.name.split('.')[0][3:])
+        except ValueError:
+            continue
+        if pid != own and not _pid_alive(pid):
+            yield path
+
+
+def replay(paths):
+    # Coalesces and applies the given journals, then removes them. Returns
+    # the number of events replayed.
+    users, progress, events = {}, {}, 0
+    for path in paths:
+        with open(path, encoding='utf-8') as journal:
+            for line in journal:
+                # A crash can leave a torn last line behind
+                try:
+                    user_id, career_id, delta = Delta.from_json(line)
+                except (ValueError, KeyError):
+                    continue
+                _merge(users, progress, user_id, career_id, delta)
+                events += 1
+    if users:
+        apply(users, progress)
+    for path in paths:
+        path.unlink(missing_ok=True)
+    return events
+
+
+def _flush_periodically(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            flush()
+        except Exception:
+            # Deltas stay pending and are retried on the next tick
+            logger.exception('Flushing write-behind XP failed; %d users stay pending', len(_users))
+        finally:
+            close_old_connections()
+
+
+def _start_flusher():
+    global _flusher
+    if _flusher is not None:
+        return
+    with _lock:
+        if _flusher is not None:
+            return
+        interval = getattr(settings, 'XP_WRITE_BEHIND_FLUSH_INTERVAL', 5)
+        if interval:
+            _flusher = threading.Thread(target=_flush_periodically, args=(interval,), daemon=True)
+            _flusher.start()
+        else:
+            _flusher = False
+        atexit.register(flush)
@@ -12,5 +12,13 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'career_craft.settings')
+# Async views for the hot read endpoints; see ROOT_URLCONF in settings.py
+os.environ.setdefault('API_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
+
+# With API_WARMUP, connect to the database and load the per-worker indexes
+# before the first request, see api/warmup.py
+from api import warmup  # noqa: E402
+
+warmup.on_serve()
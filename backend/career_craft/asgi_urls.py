@@ -0,0 +1,12 @@
+"""
+URL configuration for the ASGI application: career_craft/urls.py with the
+async variants of the hot read endpoints (api/async_views.py) routed first.
+"""
+from django.urls import path, include
+from api.urls import async_urlpatterns
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path('api/', include(async_urlpatterns)),
+    *sync_urlpatterns,
+]
@@ -0,0 +1,64 @@
+"""
+Cache settings from the environment, for settings.CACHES.
+
+CACHE_BACKEND picks the backend:
+
+- "locmem" (the default): memory private to each process. Nothing one
+  worker stores or invalidates reaches the others, so with it the
+  per-worker auth caches stay off and content cached in memory is only
+  trusted for UNSHARED_CACHE_TIMEOUT seconds (see api/generations.py).
+  Suits a single process: runserver, the tests, one-worker deployments.
+- "redis": Django's RedisCache (needs redis-py) at CACHE_LOCATION,
+  redis://127.0.0.1:6379/0 by default.
+- "memcached": Django's PyMemcacheCache (needs pymemcache) at
+  CACHE_LOCATION, 127.0.0.1:11211 by default.
+
+Every worker of a deployment must point at the same Redis or memcached for
+the invalidation in api/generations.py to reach all of them. Keys are
+prefixed with CACHE_KEY_PREFIX, so several deployments can share a server.
+"""
+
+from .database import env, env_int
+
+BACKENDS = ('locmem', 'redis', 'memcached')
+
+
+def backend():
+    name = env('CACHE_BACKEND', 'locmem').lower()
+    if name not in BACKENDS:
+        raise ValueError(f'CACHE_BACKEND must be one of {", ".join(BACKENDS)}, not "{name}"')
+    return name
+
+
+def shared():
+    # Whether every worker sees the same cache
+    return backend() != 'locmem'
+
+
+def locmem():
+    return {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {
+            'MAX_ENTRIES': env_int('CACHE_MAX_ENTRIES', 10000),
+        },
+    }
+
+
+def redis():
+    return {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': env('CACHE_LOCATION', 'redis://127.0.0.1:6379/0'),
+        'KEY_PREFIX': env('CACHE_KEY_PREFIX', 'career_craft'),
+    }
+
+
+def memcached():
+    return {
+        'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+        'LOCATION': env('CACHE_LOCATION', '127.0.0.1:11211'),
+        'KEY_PREFIX': env('CACHE_KEY_PREFIX', 'career_craft'),
+    }
+
+
+def caches():
+    return {'default': {'locmem': locmem, 'redis': redis, 'memcached': memcached}[backend()]()}
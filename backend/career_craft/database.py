@@ -0,0 +1,102 @@
+"""
+Database settings from the environment, for settings.DATABASES.
+
+DATABASE_PROFILE picks the backend:
+
+- "sqlite" (the default): a single SQLite file, DATABASE_NAME or db.sqlite3
+  next to manage.py. Every connection is tuned for many readers and a
+  steady stream of short writes: WAL journaling so reads don't block on
+  the writer, synchronous=NORMAL (durable at WAL checkpoints rather than
+  on every commit, which is safe against corruption), a memory-mapped read
+  path, and write transactions that take the lock up front (BEGIN
+  IMMEDIATE) and wait up to SQLITE_BUSY_TIMEOUT seconds for it instead of
+  failing with "database is locked". Suits a single node.
+- "postgres": PostgreSQL through psycopg 3, from DATABASE_NAME, _USER,
+  _PASSWORD, _HOST and _PORT. Connections are kept open for
+  DATABASE_CONN_MAX_AGE seconds and checked before reuse, or, with
+  DATABASE_POOL=1 (needs psycopg[pool]), drawn from a per-process pool of
+  DATABASE_POOL_MIN_SIZE to DATABASE_POOL_MAX_SIZE connections, which also
+  serves servers that run each request on a new thread.
+"""
+
+import os
+
+PROFILES = ('sqlite', 'postgres')
+
+
+def env(name, default=None):
+    return os.environ.get(name, default)
+
+
+def env_int(name, default):
+    value = os.environ.get(name)
+    return default if value in (None, '') else int(value)
+
+
+def env_bool(name, default=False):
+    value = os.environ.get(name)
+    return default if value in (None, '') else value.lower() in ('1', 'true', 'yes', 'on')
+
+
+def sqlite_pragmas():
+    # Run on every new connection; journal_mode=WAL persists in the file,
+    # the rest are per connection
+    return ';'.join([
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',
+        f'PRAGMA mmap_size={env_int("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)}',
+        f'PRAGMA cache_size=-{env_int("SQLITE_CACHE_KB", 20000)}',
+        'PRAGMA temp_store=MEMORY',
+    ])
+
+
+def sqlite(base_dir):
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': env('DATABASE_NAME', base_dir / 'db.sqlite3'),
+        'OPTIONS': {
+            'init_command': sqlite_pragmas(),
+            'transaction_mode': 'IMMEDIATE',
+            # Seconds to wait for the write lock, as sqlite3.connect(timeout=)
+            'timeout': env_int('SQLITE_BUSY_TIMEOUT', 20),
+        },
+        # A file-backed test database, since the in-memory one fails
+        # concurrent writers with "database table is locked"
+        'TEST': {
+            'NAME': base_dir / 'test_db.sqlite3',
+        },
+    }
+
+
+def postgres(base_dir):
+    pooled = env_bool('DATABASE_POOL')
+    options = {'connect_timeout': env_int('DATABASE_CONNECT_TIMEOUT', 5)}
+    if pooled:
+        options['pool'] = {
+            'min_size': env_int('DATABASE_POOL_MIN_SIZE', 2),
+            'max_size': env_int('DATABASE_POOL_MAX_SIZE', 20),
+            'timeout': env_int('DATABASE_POOL_TIMEOUT', 10),
+        }
+    return {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': env('DATABASE_NAME', 'career_craft'),
+        'USER': env('DATABASE_USER', ''),
+        'PASSWORD': env('DATABASE_PASSWORD', ''),
+        'HOST': env('DATABASE_HOST', ''),
+        'PORT': env('DATABASE_PORT', ''),
+        # The pool keeps connections itself; Django refuses both at once
+        'CONN_MAX_AGE': 0 if pooled else env_int('DATABASE_CONN_MAX_AGE', 60),
+        'CONN_HEALTH_CHECKS': not pooled,
+        'OPTIONS': options,
+    }
+
+
+def profile():
+    name = env('DATABASE_PROFILE', 'sqlite').lower()
+    if name not in PROFILES:
+        raise ValueError(f'DATABASE_PROFILE must be one of {", ".join(PROFILES)}, not "{name}"')
+    return name
+
+
+def databases(base_dir):
+    return {'default': {'sqlite': sqlite, 'postgres': postgres}[profile()](base_dir)}
@@ -10,7 +10,9 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+from datetime import timedelta
 from pathlib import Path
+from . import caches, database
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -51,6 +53,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Query counts and timings per request, see api/instrumentation.py
+    'api.instrumentation.InstrumentationMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -65,15 +69,48 @@ MIDDLEWARE = [
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.BasicAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
+        # BasicAuthentication remembering good credentials briefly
+        'api.authentication.CachedBasicAuthentication',
+        # TokenAuthentication with expiry and a per-worker cache, see api/authentication.py
+        'api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # Opt-in keyset pagination (?page_size= / ?cursor=), see api/pagination.py
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.KeysetPagination',
+    # orjson-backed when it is installed, DRF's stdlib JSON otherwise
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
-ROOT_URLCONF = 'career_craft.urls'
+# A request running the same SQL shape more than this many times is logged
+# as a possible N+1 query
+INSTRUMENTATION_N_PLUS_ONE_THRESHOLD = 10
+
+# Send every response's query count and db/serialize/render/app timings in a
+# Server-Timing header, with INSTRUMENTATION_SERVER_TIMING=1. The load test's
+# in-process server turns it on; a server given to it by URL needs it.
+INSTRUMENTATION_SERVER_TIMING = database.env_bool('INSTRUMENTATION_SERVER_TIMING')
+
+# Gzip responses for clients that send Accept-Encoding: gzip, with API_GZIP=1.
+# Off by default: most responses are small, and compressing secrets next to
+# user-controlled content exposes them to BREACH-style attacks.
+API_GZIP = database.env_bool('API_GZIP')
+if API_GZIP:
+    MIDDLEWARE.insert(0, 'django.middleware.gzip.GZipMiddleware')
+
+# career_craft/asgi.py sets API_ASYNC_VIEWS, so that under ASGI the hot read
+# endpoints are served by the async views in api/async_views.py
+API_ASYNC_VIEWS = database.env_bool('API_ASYNC_VIEWS')
+ROOT_URLCONF = 'career_craft.asgi_urls' if API_ASYNC_VIEWS else 'career_craft.urls'
 
 TEMPLATES = [
     {
@@ -95,13 +132,64 @@ WSGI_APPLICATION = 'career_craft.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
-
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
-}
+#
+# Tuned SQLite by default, or pooled PostgreSQL with DATABASE_PROFILE=postgres;
+# see career_craft/database.py for the environment variables
+
+DATABASE_PROFILE = database.profile()
+DATABASES = database.databases(BASE_DIR)
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+#
+# Per-process memory by default, or Redis or memcached shared by every worker
+# with CACHE_BACKEND; see career_craft/caches.py for the environment variables
+
+CACHES = caches.caches()
+# Whether every worker sees the same cache, so that invalidation reaches
+# them all; set it when configuring a shared backend here by hand
+CACHE_SHARED = caches.shared()
+# Seconds a worker trusts what it cached in memory, or under keys only it
+# can invalidate, when the cache isn't shared
+UNSHARED_CACHE_TIMEOUT = 60
+
+# Seconds a rendered learning page stays cached (UNSHARED_CACHE_TIMEOUT at
+# most with a per-process cache); edits invalidate it sooner
+LEARNING_PAGE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Write-behind XP accounting: quiz scoring journals XP/streak deltas locally
+# and a background thread flushes them in coalesced batches (api/xp_buffer.py)
+XP_WRITE_BEHIND = False
+XP_WRITE_BEHIND_DIR = BASE_DIR / 'xp_journal'
+XP_WRITE_BEHIND_FLUSH_INTERVAL = 5  # seconds; 0 leaves flushing to the caller
+XP_WRITE_BEHIND_FSYNC = False
+
+# Seconds before a worker reloads its in-memory leaderboards from the
+# database, picking up XP earned through other workers
+LEADERBOARD_REFRESH_INTERVAL = 60
+
+
+# Auth tokens expire this long after they are issued (None: never); logging
+# in again replaces an expired token, and purge_expired_tokens deletes them
+AUTH_TOKEN_LIFETIME = timedelta(days=30)
+# Seconds a worker keeps the user for a token in memory, and for how many tokens
+AUTH_TOKEN_CACHE_TTL = 60
+AUTH_TOKEN_CACHE_SIZE = 10000
+# Seconds a worker remembers a good username/password pair, skipping the
+# password hash, and for how many pairs
+AUTH_BASIC_CACHE_TTL = 30
+AUTH_BASIC_CACHE_SIZE = 1000
+# Registrations hashing their password at once (None: one per CPU), and how
+# many more may wait for a turn before the rest get a 503
+PASSWORD_HASHING_WORKERS = None
+PASSWORD_HASHING_QUEUE = 64
+
+
+# Prime each new worker before its first request, see api/warmup.py; and the
+# slowest first request `manage.py warmup --check` accepts from a new worker
+API_WARMUP = database.env_bool('API_WARMUP')
+API_WARMUP_BUDGET_MS = 100
 
 
 # Password validation
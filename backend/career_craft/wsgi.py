@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'career_craft.settings')
 
 application = get_wsgi_application()
+
+# With API_WARMUP, connect to the database and load the per-worker indexes
+# before the first request, see api/warmup.py
+from api import warmup  # noqa: E402
+
+warmup.on_serve()